@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GhorerBazar.settings')
 
 application = get_asgi_application()
+
+# warm the in-process autocomplete index without delaying startup
+from product.suggest import suggest_index  # noqa: E402
+
+suggest_index.build_async()
@@ -98,6 +98,24 @@ DATABASES = {
     )
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ghorerbazar'),
+    }
+}
+
+# seconds a cached catalog response lives (entries are also invalidated by version bumps)
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# seconds the admin order stats are cached
+ORDER_STATS_CACHE_TIMEOUT = config('ORDER_STATS_CACHE_TIMEOUT', default=60, cast=int)
+
+# Idempotency-Key: how long a stored response is replayed (seconds), and how
+# long a duplicate waits for the first request to finish before a 409
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)
+IDEMPOTENCY_WAIT_TIMEOUT = config('IDEMPOTENCY_WAIT_TIMEOUT', default=10, cast=float)
+
 
 INTERNAL_IPS = [
     # ...
@@ -226,6 +244,20 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
 SSLCOMMERZ_STORE_ID = config('SSLCOMMERZ_STORE_ID')
 SSLCOMMERZ_STORE_PASSWORD = config('SSLCOMMERZ_STORE_PASSWORD')
+SSLCOMMERZ_LIVE = config('SSLCOMMERZ_LIVE', default=False, cast=bool)
+# empty: sandbox or live host depending on SSLCOMMERZ_LIVE (point it at a stub server in tests)
+SSLCOMMERZ_BASE_URL = config('SSLCOMMERZ_BASE_URL', default='')
+SSLCOMMERZ_CONNECT_TIMEOUT = config('SSLCOMMERZ_CONNECT_TIMEOUT', default=3.05, cast=float)
+SSLCOMMERZ_READ_TIMEOUT = config('SSLCOMMERZ_READ_TIMEOUT', default=10, cast=float)
+SSLCOMMERZ_RETRIES = config('SSLCOMMERZ_RETRIES', default=2, cast=int)
+SSLCOMMERZ_BACKOFF = config('SSLCOMMERZ_BACKOFF', default=0.3, cast=float)
+SSLCOMMERZ_POOL_SIZE = config('SSLCOMMERZ_POOL_SIZE', default=10, cast=int)
+SSLCOMMERZ_BREAKER_THRESHOLD = config('SSLCOMMERZ_BREAKER_THRESHOLD', default=5, cast=int)
+SSLCOMMERZ_BREAKER_RESET = config('SSLCOMMERZ_BREAKER_RESET', default=30, cast=float)
+# async client pool (one per event loop)
+SSLCOMMERZ_ASYNC_MAX_CONNECTIONS = config('SSLCOMMERZ_ASYNC_MAX_CONNECTIONS', default=200, cast=int)
+# serve the payment session / IPN endpoints with the async views (set when running under ASGI)
+ASYNC_PAYMENT_VIEWS = config('ASYNC_PAYMENT_VIEWS', default=False, cast=bool)
 
 # SSLCOMMERZ_SUCCESS_URL = "https://ghorer-bazar-client.vercel.app/payment-success"
 SSLCOMMERZ_SUCCESS_URL = "https://groc-ashy.vercel.app/payment-success"
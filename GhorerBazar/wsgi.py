@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GhorerBazar.settings')
 
 app = get_wsgi_application()
+
+# warm the in-process autocomplete index without delaying startup
+from product.suggest import suggest_index  # noqa: E402
+
+suggest_index.build_async()
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from order.models import Order, OrderItem
+from product.models import Category, Product
+from users.models import User
+
+
+INDEX_NAMES = [
+    'product_category_price_idx',
+    'product_seller_id_idx',
+    'order_user_created_idx',
+    'order_status_created_idx',
+    'order_not_paid_idx',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the query plan and timing of the hot catalog/order access paths. '
+        'Run it before and after `migrate` to compare plans with and without the composite indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Timed executions per query')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Use EXPLAIN ANALYZE (PostgreSQL only)')
+
+    def access_paths(self):
+        category_ids = list(Category.objects.values_list('id', flat=True)[:3]) or [1]
+        seller = User.objects.filter(role=User.SELLER).values_list('id', flat=True).first() or 1
+        user = Order.objects.values_list('user_id', flat=True).first() or 1
+        return [
+            ('ProductFilter category + price',
+             Product.objects.filter(category__id__in=category_ids, price__gt=0, price__lt=1000).order_by('price')[:10]),
+            ('Seller products newest first',
+             Product.objects.filter(seller_id=seller).order_by('-id')[:10]),
+            ('Purchase history',
+             Order.objects.filter(user_id=user).order_by('-created_at')[:10]),
+            ('Orders by status',
+             Order.objects.filter(status=Order.READY_TO_SHIP).order_by('created_at')[:10]),
+            ('Unpaid orders',
+             Order.objects.filter(status=Order.NOT_PAID).order_by('created_at')[:10]),
+            ('Seller order items',
+             OrderItem.objects.filter(product__seller_id=seller).values('order_id')[:10]),
+        ]
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        for label, queryset in self.access_paths():
+            plan = queryset.explain(**explain_options)
+            used = [name for name in INDEX_NAMES if name in plan]
+
+            started = time.perf_counter()
+            for _ in range(options['runs']):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / options['runs'] * 1000
+
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            self.stdout.write(
+                f'  composite indexes used: {", ".join(used) or "none"}\n'
+                f'  mean: {elapsed:.3f} ms over {options["runs"]} run(s)\n'
+            )
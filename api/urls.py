@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.urls import path,include
 from rest_framework_nested import routers
 
 from product.views import ProductViewSet, CategoryViewSet ,ReviewViewSet, ProductImageViewSet,SellerProductViewSet
 from order.views import CartViewSet,CartItemViewSet,OrderViewSet, SellerOrderViewSet, WishlistViewSet
 from users.views import DepositView , UserRoleManagementViewSet
-from order.views import SSLCommerzPaymentView, SSLCommerzIPNView
+from order.views import SSLCommerzPaymentView, SSLCommerzIPNView, SellerAnalyticsView, OrderStatsView
+from order.async_views import AsyncSSLCommerzPaymentView, AsyncSSLCommerzIPNView
 from users.views import UserProfileView
 
 router = routers.DefaultRouter()
@@ -26,6 +28,14 @@ product_router.register('images',ProductImageViewSet,basename='product-images')
 cart_router = routers.NestedDefaultRouter(router,'carts',lookup='cart')
 cart_router.register('items',CartItemViewSet,basename='cart_item')
 
+# gateway-bound views: async versions when served over ASGI
+if settings.ASYNC_PAYMENT_VIEWS:
+    payment_session_view = AsyncSSLCommerzPaymentView.as_view()
+    payment_ipn_view = AsyncSSLCommerzIPNView.as_view()
+else:
+    payment_session_view = SSLCommerzPaymentView.as_view()
+    payment_ipn_view = SSLCommerzIPNView.as_view()
+
 
 urlpatterns = [
     path('',include(router.urls)),
@@ -35,8 +45,10 @@ urlpatterns = [
     path('auth/', include('djoser.urls.jwt')),
     path('deposit/', DepositView.as_view(), name='deposit'),
     # path("create-checkout-session/", CreateStripeSessionView.as_view(), name="create-checkout-session"),
-    path("create-sslcommerz-session/", SSLCommerzPaymentView.as_view(), name="sslcommerz-session"),
-    path("sslcommerz-ipn/", SSLCommerzIPNView.as_view(), name="sslcommerz-ipn"),
+    path("create-sslcommerz-session/", payment_session_view, name="sslcommerz-session"),
+    path("sslcommerz-ipn/", payment_ipn_view, name="sslcommerz-ipn"),
     path('users/profile/', UserProfileView.as_view(), name='user-profile'),
+    path('seller-analytics/', SellerAnalyticsView.as_view(), name='seller-analytics'),
+    path('admin/order-stats/', OrderStatsView.as_view(), name='admin-order-stats'),
 
 ]
\ No newline at end of file
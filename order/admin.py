@@ -1,5 +1,6 @@
 from django.contrib import admin
-from order.models import Cart,CartItem,Order,OrderItem, Wishlist
+from order.models import Cart,CartItem,Order,OrderItem, Wishlist, Payment
+from order.services import OrderService
 # Register your models here.
 
 @admin.register(Cart)
@@ -11,6 +12,21 @@ admin.site.register(CartItem)
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id','user','status']
+    list_filter = ['status']
+    actions = ['cancel_orders']
+
+    @admin.action(description='Cancel selected orders (refund + restock)')
+    def cancel_orders(self, request, queryset):
+        canceled = OrderService.cancel_orders(queryset.values_list('pk', flat=True))
+        skipped = queryset.count() - canceled
+        self.message_user(request, f'{canceled} order(s) canceled, {skipped} skipped (delivered or already canceled).')
 # admin.site.register(Cart)
 admin.site.register(OrderItem)
-admin.site.register(Wishlist)
\ No newline at end of file
+admin.site.register(Wishlist)
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ['tran_id', 'val_id', 'status', 'amount', 'paid_amount', 'created_at']
+    list_filter = ['status']
+    search_fields = ['tran_id', 'val_id']
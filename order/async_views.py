@@ -0,0 +1,138 @@
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from order import gateway, notifications, payments
+from order.idempotency import idempotent
+from order.models import Order
+from users.models import User
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of the DRF views for gateway-bound endpoints
+    (DRF views are sync only). JWT authentication and the default throttles
+    are applied like DRF does; responses are JSON.
+    """
+    authenticated = True
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+
+    @method_decorator(csrf_exempt)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        auth = JWTAuthentication()
+        header = auth.get_header(request)
+        raw_token = auth.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        token = auth.get_validated_token(raw_token)
+        return await User.objects.filter(
+            **{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]}, is_active=True,
+        ).afirst()
+
+    async def check(self, request):
+        """Authenticate and throttle; returns an error response or None."""
+        try:
+            user = await self.authenticate(request)
+        except (InvalidToken, TokenError):
+            return JsonResponse({'detail': 'Given token not valid for any token type'}, status=401)
+        if user is not None:
+            request.user = user
+        if self.authenticated and user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await sync_to_async(throttle.allow_request)(request, self):
+                return JsonResponse({'detail': 'Request was throttled.'}, status=429)
+        return None
+
+    @staticmethod
+    def parse(request):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return None
+            return data if isinstance(data, dict) else None
+        return request.POST.dict()
+
+
+class AsyncSSLCommerzPaymentView(AsyncAPIView):
+    """
+    Async SSLCommerz session creation: the gateway round trip is awaited,
+    so one ASGI worker can hold many of them in flight.
+    """
+
+    async def post(self, request):
+        error = await self.check(request)
+        if error:
+            return error
+        return await self.create_session(request)
+
+    @idempotent('payments.session')
+    async def create_session(self, request):
+        data = self.parse(request)
+        if data is None:
+            return JsonResponse({'detail': 'Malformed request body.'}, status=400)
+        try:
+            order_id = uuid.UUID(str(data.get('order_id')))
+        except ValueError:
+            return JsonResponse({'order_id': ['Must be a valid UUID.']}, status=400)
+
+        order = await Order.objects.filter(pk=order_id, user=request.user, status=Order.NOT_PAID).afirst()
+        if order is None:
+            return JsonResponse(
+                {'order_id': ['Order not found, does not belong to you, or is no longer payable.']}, status=400,
+            )
+
+        payload = gateway.session_payload(order, request.user)
+
+        try:
+            data = await gateway.get_async_client().create_session(payload)
+        except gateway.CircuitOpen:
+            return JsonResponse({"error": "Payment gateway unavailable, try again shortly"}, status=503)
+        except gateway.GatewayError:
+            return JsonResponse({"error": "Failed to create SSLCommerz session"}, status=502)
+
+        if data.get("status") == "SUCCESS":
+            await payments.session_payment(order, data).asave()
+            return JsonResponse({"payment_url": data.get("GatewayPageURL")})
+        return JsonResponse({"error": "Failed to create SSLCommerz session"}, status=400)
+
+
+class AsyncSSLCommerzIPNView(AsyncAPIView):
+    """Async IPN intake: stores the notification (see SSLCommerzIPNView) and returns 202."""
+    authenticated = False
+    throttle_classes = ()
+
+    async def post(self, request):
+        data = self.parse(request) or {}
+        tran_id = data.get("tran_id")
+        val_id = data.get("val_id")
+
+        if not tran_id or not val_id:
+            return JsonResponse({"error": "Missing tran_id or val_id"}, status=400)
+        if len(str(tran_id)) > 64 or len(str(val_id)) > 255:
+            return JsonResponse({"error": "Invalid tran_id or val_id"}, status=400)
+        if not await notifications.ais_payable(tran_id):
+            return JsonResponse({"error": "Order not found or already processed"}, status=404)
+
+        await notifications.aenqueue(tran_id, val_id, data)
+
+        return JsonResponse({
+            "success": True,
+            "order_id": tran_id,
+            "message": "Payment notification received"
+        }, status=202)
@@ -0,0 +1,338 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_URL = 'https://sandbox.sslcommerz.com'
+LIVE_URL = 'https://securepay.sslcommerz.com'
+SESSION_PATH = '/gwprocess/v4/api.php'
+VALIDATION_PATH = '/validator/api/validationserverAPI.php'
+RETRY_STATUSES = (502, 503, 504)
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or answered with an error."""
+
+
+class CircuitOpen(GatewayError):
+    """Calls are short-circuited after repeated failures."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets one trial call through (half-open).
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class CallMetrics:
+    """Per-call counters and recent latencies (ms) for this process."""
+    window = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._rejected = defaultdict(int)
+        self._latencies = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, name, elapsed, ok):
+        with self._lock:
+            self._calls[name] += 1
+            if not ok:
+                self._errors[name] += 1
+            self._latencies[name].append(elapsed * 1000)
+
+    def reject(self, name):
+        with self._lock:
+            self._rejected[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = {}
+            for name in set(self._calls) | set(self._rejected):
+                latencies = sorted(self._latencies[name]) or [0]
+                stats[name] = {
+                    'calls': self._calls[name],
+                    'errors': self._errors[name],
+                    'rejected': self._rejected[name],
+                    'avg_ms': round(sum(latencies) / len(latencies), 2),
+                    'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                    'max_ms': round(latencies[-1], 2),
+                }
+            return stats
+
+
+def _options(base_url=None, connect_timeout=None, read_timeout=None, retries=None, backoff=None):
+    """Explicit arguments win over settings, settings over defaults."""
+    default_url = LIVE_URL if getattr(settings, 'SSLCOMMERZ_LIVE', False) else SANDBOX_URL
+    return {
+        'base_url': (base_url or getattr(settings, 'SSLCOMMERZ_BASE_URL', '') or default_url).rstrip('/'),
+        'connect_timeout': connect_timeout if connect_timeout is not None else getattr(settings, 'SSLCOMMERZ_CONNECT_TIMEOUT', 3.05),
+        'read_timeout': read_timeout if read_timeout is not None else getattr(settings, 'SSLCOMMERZ_READ_TIMEOUT', 10),
+        'retries': retries if retries is not None else getattr(settings, 'SSLCOMMERZ_RETRIES', 2),
+        'backoff': backoff if backoff is not None else getattr(settings, 'SSLCOMMERZ_BACKOFF', 0.3),
+    }
+
+
+def _breaker():
+    return CircuitBreaker(
+        threshold=getattr(settings, 'SSLCOMMERZ_BREAKER_THRESHOLD', 5),
+        reset_timeout=getattr(settings, 'SSLCOMMERZ_BREAKER_RESET', 30),
+    )
+
+
+def _validation_params(val_id):
+    return {
+        'val_id': val_id,
+        'store_id': settings.SSLCOMMERZ_STORE_ID,
+        'store_passwd': settings.SSLCOMMERZ_STORE_PASSWORD,
+        'v': '1',
+        'format': 'json',
+    }
+
+
+def session_payload(order, user):
+    """Form fields for a payment session of `order` paid by `user`."""
+    return {
+        "store_id": settings.SSLCOMMERZ_STORE_ID,
+        "store_passwd": settings.SSLCOMMERZ_STORE_PASSWORD,
+        "total_amount": str(order.total_price),
+        "currency": "BDT",
+        "tran_id": str(order.id),
+        "success_url": settings.SSLCOMMERZ_SUCCESS_URL,
+        "fail_url": settings.SSLCOMMERZ_FAIL_URL,
+        "cancel_url": settings.SSLCOMMERZ_CANCEL_URL,
+        "cus_name": user.get_full_name(),
+        "cus_email": user.email,
+        "cus_add1": "N/A",
+        "cus_city": "N/A",
+        "cus_country": "Bangladesh",
+        "shipping_method": "NO",
+        "product_name": "Cart Order",
+        "product_category": "General",
+        "product_profile": "general",
+    }
+
+
+class SSLCommerzClient:
+    """
+    Shared SSLCommerz client.
+     - One pooled keep-alive `requests.Session` per process
+     - Connect/read timeouts on every call
+     - Retries with backoff: connection errors always, 502/503/504 on GET
+       only (a POST that reached the gateway is never replayed)
+     - Circuit breaker so a dead gateway fails fast instead of tying up workers
+     - Latency metrics per call (`metrics.snapshot()`)
+    `base_url` defaults to SSLCOMMERZ_BASE_URL, so tests can point it at a
+    local stub server.
+    """
+
+    def __init__(self, base_url=None, connect_timeout=None, read_timeout=None,
+                 retries=None, backoff=None, pool_size=None, breaker=None):
+        options = _options(base_url, connect_timeout, read_timeout, retries, backoff)
+        self.base_url = options['base_url']
+        self.timeout = (options['connect_timeout'], options['read_timeout'])
+        pool_size = pool_size or getattr(settings, 'SSLCOMMERZ_POOL_SIZE', 10)
+
+        self.breaker = breaker or _breaker()
+        self.metrics = CallMetrics()
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=options['retries'],
+                backoff_factor=options['backoff'],
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({'GET'}),
+                raise_on_status=False,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _call(self, name, method, path, **kwargs):
+        if not self.breaker.allow():
+            self.metrics.reject(name)
+            raise CircuitOpen(f'SSLCommerz {name}: circuit open')
+
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as exc:
+            elapsed = time.perf_counter() - started
+            self.breaker.failure()
+            self.metrics.record(name, elapsed, ok=False)
+            # the exception text carries the request URL (store credentials
+            # for validation calls), so only its type is logged
+            logger.warning('SSLCommerz %s failed after %.0f ms: %s', name, elapsed * 1000, type(exc).__name__)
+            raise GatewayError(f'SSLCommerz {name} failed: {type(exc).__name__}') from exc
+
+        elapsed = time.perf_counter() - started
+        self.breaker.success()
+        self.metrics.record(name, elapsed, ok=True)
+        logger.info('SSLCommerz %s took %.0f ms', name, elapsed * 1000)
+        return data
+
+    def create_session(self, payload):
+        return self._call('create_session', 'POST', SESSION_PATH, data=payload)
+
+    def validate(self, val_id):
+        return self._call('validate', 'GET', VALIDATION_PATH, params=_validation_params(val_id))
+
+
+class AsyncSSLCommerzClient:
+    """
+    SSLCommerz client for the async (ASGI) views, on `httpx.AsyncClient`.
+    Same settings, timeouts and retry rules as SSLCommerzClient; shares its
+    breaker and metrics when created through get_async_client(), so both
+    code paths see the same gateway health. One instance per event loop.
+    """
+
+    def __init__(self, base_url=None, connect_timeout=None, read_timeout=None,
+                 retries=None, backoff=None, max_connections=None, breaker=None, metrics=None):
+        options = _options(base_url, connect_timeout, read_timeout, retries, backoff)
+        self.base_url = options['base_url']
+        self.retries = options['retries']
+        self.backoff = options['backoff']
+        self.breaker = breaker or _breaker()
+        self.metrics = metrics or CallMetrics()
+
+        max_connections = max_connections or getattr(settings, 'SSLCOMMERZ_ASYNC_MAX_CONNECTIONS', 200)
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(options['read_timeout'], connect=options['connect_timeout']),
+            limits=limits,
+            # retries here are connection failures only, like urllib3's connect retries
+            transport=httpx.AsyncHTTPTransport(retries=self.retries, limits=limits),
+        )
+
+    async def _send(self, method, path, **kwargs):
+        attempt = 0
+        while True:
+            response = await self.client.request(method, path, **kwargs)
+            if method != 'GET' or response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                return response
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    async def _call(self, name, method, path, **kwargs):
+        if not self.breaker.allow():
+            self.metrics.reject(name)
+            raise CircuitOpen(f'SSLCommerz {name}: circuit open')
+
+        started = time.perf_counter()
+        try:
+            response = await self._send(method, path, **kwargs)
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            elapsed = time.perf_counter() - started
+            self.breaker.failure()
+            self.metrics.record(name, elapsed, ok=False)
+            logger.warning('SSLCommerz %s failed after %.0f ms: %s', name, elapsed * 1000, type(exc).__name__)
+            raise GatewayError(f'SSLCommerz {name} failed: {type(exc).__name__}') from exc
+
+        elapsed = time.perf_counter() - started
+        self.breaker.success()
+        self.metrics.record(name, elapsed, ok=True)
+        logger.info('SSLCommerz %s took %.0f ms', name, elapsed * 1000)
+        return data
+
+    async def create_session(self, payload):
+        return await self._call('create_session', 'POST', SESSION_PATH, data=payload)
+
+    async def validate(self, val_id):
+        return await self._call('validate', 'GET', VALIDATION_PATH, params=_validation_params(val_id))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SSLCommerzClient()
+    return _client
+
+
+def reset_client(client=None):
+    """Swap (or drop) the shared client, e.g. after changing settings."""
+    global _client
+    with _client_lock:
+        _client = client
+        _async_clients.clear()
+
+
+# httpx clients are bound to the loop they were first used on
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """The async client for the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        shared = get_client()
+        client = AsyncSSLCommerzClient(base_url=shared.base_url, breaker=shared.breaker, metrics=shared.metrics)
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,189 @@
+import asyncio
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from order.models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+POLL_INTERVAL = 0.1
+
+
+def fingerprint(request):
+    """Hash of method, path and raw body: a reused key must carry the same request."""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.body or b'')
+    return digest.hexdigest()
+
+
+def _claim(user, scope, key, request_hash):
+    """Insert the in-progress row; returns (row, created)."""
+    now = timezone.now()
+    IdempotencyKey.objects.filter(user=user, scope=scope, key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, scope=scope, key=key, fingerprint=request_hash,
+                expires_at=now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)),
+            ), True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first(), False
+
+
+def _refresh(row):
+    return IdempotencyKey.objects.filter(pk=row.pk).first()
+
+
+def _wait(row):
+    """Poll until the first request stored its response, or give up."""
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+    while row is not None and row.status_code is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        row = _refresh(row)
+    return row
+
+
+async def _await_row(row):
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+    while row is not None and row.status_code is None and time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        row = await sync_to_async(_refresh)(row)
+    return row
+
+
+def _start(request, scope, key):
+    """
+    Claim the key. Returns (row, None) when this request should run, or
+    (row, error) for a reused key with a different body.
+    """
+    request_hash = fingerprint(request)
+    row, created = _claim(request.user, scope, key, request_hash)
+    if not created and row is None:
+        # the first request failed and released the key meanwhile
+        row, created = _claim(request.user, scope, key, request_hash)
+    if created:
+        return row, True, None
+    if row is not None and row.fingerprint != request_hash:
+        return row, False, ({'detail': f'{HEADER} was already used for a different request.'},
+                            status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return row, False, None
+
+
+def _outcome(row):
+    """Response (data, status, headers) for a duplicate once waiting is over."""
+    if row is None or row.status_code is None:
+        return ({'detail': 'A request with this key is still in progress or failed, retry it.'},
+                status.HTTP_409_CONFLICT, {'Retry-After': '1'})
+    return row.response_body, row.status_code, {'Idempotent-Replayed': 'true'}
+
+
+def _body(response):
+    """JSON-ready body of a handler response, or None if it cannot be replayed."""
+    if response.status_code >= 500:
+        return None
+    if hasattr(response, 'data'):
+        return {'data': json.loads(json.dumps(response.data, cls=JSONEncoder))}
+    if response.get('Content-Type', '').startswith('application/json'):
+        return {'data': json.loads(response.content or b'null')}
+    return None
+
+
+def _finish(row, response):
+    body = _body(response)
+    if body is None:
+        # nothing replayable: let the client retry for real
+        row.delete()
+        return
+    row.status_code = response.status_code
+    row.response_body = body['data']
+    row.save(update_fields=['status_code', 'response_body'])
+
+
+def _build(response_class, data, status_code, headers):
+    if response_class is JsonResponse:
+        response = JsonResponse(data, status=status_code, safe=False)
+    else:
+        response = Response(data, status=status_code)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def idempotent(scope):
+    """
+    Make a view handler safe to retry with an `Idempotency-Key` header.
+     - The first request claims the key and its response is stored for
+       IDEMPOTENCY_KEY_TTL seconds; raised errors and 5xx release the key
+       so the retry runs for real
+     - Retries get the stored response back (`Idempotent-Replayed: true`)
+       without running the handler again
+     - A duplicate arriving while the first one still runs waits up to
+       IDEMPOTENCY_WAIT_TIMEOUT seconds for it, then gets 409
+     - The same key with a different body is rejected with 422
+    Requests without the header are not affected. Works on DRF handlers
+    and on `async def` Django view handlers (replayed as JsonResponse);
+    `request.user` must be set before the handler runs.
+    """
+    def decorator(handler):
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(self, request, *args, **kwargs):
+                key = request.headers.get(HEADER)
+                if not key or not request.user.is_authenticated:
+                    return await handler(self, request, *args, **kwargs)
+                if len(key) > 255:
+                    return _build(JsonResponse, {'detail': f'{HEADER} must be at most 255 characters.'},
+                                  status.HTTP_400_BAD_REQUEST, {})
+
+                row, created, error = await sync_to_async(_start)(request, scope, key)
+                if error:
+                    return _build(JsonResponse, *error, {})
+                if not created:
+                    return _build(JsonResponse, *_outcome(await _await_row(row)))
+
+                try:
+                    response = await handler(self, request, *args, **kwargs)
+                except BaseException:
+                    await sync_to_async(row.delete)()
+                    raise
+                await sync_to_async(_finish)(row, response)
+                return response
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key or not request.user.is_authenticated:
+                return handler(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return _build(Response, {'detail': f'{HEADER} must be at most 255 characters.'},
+                              status.HTTP_400_BAD_REQUEST, {})
+
+            row, created, error = _start(request, scope, key)
+            if error:
+                return _build(Response, *error, {})
+            if not created:
+                return _build(Response, *_outcome(_wait(row)))
+
+            try:
+                response = handler(self, request, *args, **kwargs)
+            except Exception:
+                row.delete()
+                raise
+            _finish(row, response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from order import gateway
+from order.async_views import AsyncSSLCommerzPaymentView
+from order.models import Order
+from order.views import SSLCommerzPaymentView
+from users.models import User
+
+
+PATH = '/api/v1/create-sslcommerz-session/'
+
+
+def slow_gateway(delay):
+    """Local stand-in for SSLCommerz that answers every session request after `delay` seconds."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay)
+            body = json.dumps({'status': 'SUCCESS', 'GatewayPageURL': 'http://stub.invalid/pay'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync payment session view on N threads (a WSGI worker pool) with the async view '
+        'on one event loop (a single ASGI worker), both against a local gateway stub that answers '
+        'after --delay seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=8, help='Sync worker threads')
+        parser.add_argument('--delay', type=float, default=0.5, help='Gateway latency in seconds')
+
+    def report(self, label, started, results):
+        elapsed = time.perf_counter() - started
+        latencies = sorted(duration for _, duration in results)
+        statuses = {}
+        for code, _ in results:
+            statuses[code] = statuses.get(code, 0) + 1
+        self.stdout.write(
+            f'{label:<32} {len(results)} requests in {elapsed:.2f}s  '
+            f'{len(results) / elapsed:7.1f} req/s  p50 {latencies[len(latencies) // 2] * 1000:.0f} ms  '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms  status {statuses}'
+        )
+
+    def run_sync(self, options, body, auth):
+        view = SSLCommerzPaymentView.as_view(throttle_classes=())
+        factory = RequestFactory()
+
+        def call(_):
+            started = time.perf_counter()
+            try:
+                request = factory.post(PATH, body, content_type='application/json', headers={'Authorization': auth})
+                return view(request).status_code, time.perf_counter() - started
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            results = list(pool.map(call, range(options['requests'])))
+        self.report(f'sync, {options["threads"]} threads', started, results)
+
+    def run_async(self, options, body, auth):
+        view = AsyncSSLCommerzPaymentView.as_view(throttle_classes=())
+        factory = AsyncRequestFactory()
+
+        async def call():
+            started = time.perf_counter()
+            request = factory.post(PATH, body, content_type='application/json', headers={'Authorization': auth})
+            response = await view(request)
+            return response.status_code, time.perf_counter() - started
+
+        async def main():
+            return await asyncio.gather(*(call() for _ in range(options['requests'])))
+
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        self.report('async, 1 event loop', started, results)
+
+    def handle(self, *args, **options):
+        server = slow_gateway(options['delay'])
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        gateway.reset_client(gateway.SSLCommerzClient(base_url=base_url, pool_size=options['threads']))
+
+        user = User.objects.create_user(email=f'benchmark-{uuid.uuid4().hex[:8]}@example.com', password=None)
+        order = Order.objects.create(user=user, total_price=Decimal('100.00'))
+        body = json.dumps({'order_id': str(order.id)})
+        auth = f'JWT {AccessToken.for_user(user)}'
+
+        try:
+            self.stdout.write(f'gateway stub at {base_url}, {options["delay"]}s per call')
+            self.run_sync(options, body, auth)
+            self.run_async(options, body, auth)
+        finally:
+            server.shutdown()
+            gateway.reset_client()
+            user.delete()
@@ -0,0 +1,87 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from order.models import Cart, CartItem
+from order.reservations import InsufficientStock
+from order.services import CartService
+from product.models import Category, Product
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Add one product to one cart from N concurrent workers (several devices of one user) and '
+        'check that no increment is lost and the line never exceeds the stock. Creates throwaway '
+        'rows and deletes them afterwards. Use against PostgreSQL, SQLite serializes all writers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--adds', type=int, default=500, help='Total add requests')
+        parser.add_argument('--stock', type=int, default=400, help='Stock of the product')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per add')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows')
+
+    def add(self, cart_id, product_id, quantity):
+        started = time.perf_counter()
+        try:
+            CartService.add_item(cart_id, product_id, quantity)
+            outcome = 'ok'
+        except InsufficientStock:
+            outcome = 'stock_cap'
+        except Exception as exc:
+            outcome = type(exc).__name__
+        finally:
+            connections.close_all()
+        return outcome, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create_user(email=f'loadtest-seller-{tag}@example.com', password=None, role=User.SELLER)
+        buyer = User.objects.create_user(email=f'loadtest-{tag}@example.com', password=None)
+        category = Category.objects.create(name=f'Load test {tag}')
+        product = Product.objects.create(
+            name=f'Cart SKU {tag}', description='load test', price=Decimal('10.00'),
+            stock=options['stock'], category=category, seller=seller,
+        )
+        cart = Cart.objects.create(user=buyer)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(
+                lambda _: self.add(cart.id, product.id, options['quantity']), range(options['adds']),
+            ))
+        elapsed = time.perf_counter() - started
+
+        outcomes = {}
+        for outcome, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = sorted(duration for _, duration in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0
+
+        in_cart = CartItem.objects.filter(cart=cart, product=product).values_list('quantity', flat=True).first() or 0
+        added = outcomes.get('ok', 0) * options['quantity']
+        consistent = in_cart == added and in_cart <= options['stock']
+
+        self.stdout.write(
+            f'workers={options["workers"]} adds={options["adds"]} in {elapsed:.2f}s '
+            f'({options["adds"] / elapsed:.1f}/s, p95 {p95:.1f} ms)\n'
+            f'outcomes: {outcomes}\n'
+            f'cart line: {in_cart} (stock {options["stock"]}, successful adds {added})'
+        )
+
+        if not options['keep']:
+            buyer.delete()
+            product.delete()
+            category.delete()
+            seller.delete()
+
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('Cart line matches the successful adds and stays within stock.'))
+        else:
+            self.stdout.write(self.style.ERROR('Cart line does NOT match the successful adds.'))
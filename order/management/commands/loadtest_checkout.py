@@ -0,0 +1,96 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from order.models import Cart, CartItem, Order
+from order.reservations import InsufficientStock
+from order.services import OrderService
+from product.models import Category, Product
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Check out one hot SKU from N concurrent workers and report throughput, '
+        'stock-outs and whether the final stock adds up. Creates throwaway users/products '
+        'and deletes them afterwards. Use against PostgreSQL, SQLite serializes all writers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--checkouts', type=int, default=200, help='Total checkout attempts')
+        parser.add_argument('--stock', type=int, default=150, help='Starting stock of the hot SKU')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per checkout')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows')
+
+    def setup(self, options, tag):
+        seller = User.objects.create_user(email=f'loadtest-seller-{tag}@example.com', password=None, role=User.SELLER)
+        category = Category.objects.create(name=f'Load test {tag}')
+        product = Product.objects.create(
+            name=f'Hot SKU {tag}', description='load test', price=Decimal('10.00'),
+            stock=options['stock'], category=category, seller=seller,
+        )
+        carts = []
+        for number in range(options['checkouts']):
+            buyer = User.objects.create_user(
+                email=f'loadtest-{tag}-{number}@example.com', password=None, balance=Decimal('1000000'),
+            )
+            cart = Cart.objects.create(user=buyer)
+            CartItem.objects.create(cart=cart, product=product, quantity=options['quantity'])
+            carts.append((buyer.id, cart.id))
+        return seller, category, product, carts
+
+    def checkout(self, user_id, cart_id):
+        started = time.perf_counter()
+        try:
+            OrderService.create_order(user_id=user_id, cart_id=cart_id)
+            outcome = 'ok'
+        except InsufficientStock:
+            outcome = 'out_of_stock'
+        except Exception as exc:
+            outcome = type(exc).__name__
+        finally:
+            connections.close_all()
+        return outcome, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller, category, product, carts = self.setup(options, tag)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(lambda args: self.checkout(*args), carts))
+        elapsed = time.perf_counter() - started
+
+        outcomes = {}
+        for outcome, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = sorted(duration for _, duration in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0
+
+        product.refresh_from_db()
+        sold = outcomes.get('ok', 0) * options['quantity']
+        consistent = product.stock == options['stock'] - sold and product.stock >= 0
+
+        self.stdout.write(
+            f'workers={options["workers"]} checkouts={len(carts)} in {elapsed:.2f}s '
+            f'({len(carts) / elapsed:.1f}/s, p95 {p95:.1f} ms)\n'
+            f'outcomes: {outcomes}\n'
+            f'stock: {options["stock"]} -> {product.stock}, sold {sold}'
+        )
+
+        if not options['keep']:
+            Order.objects.filter(user__email__startswith=f'loadtest-{tag}-').delete()
+            User.objects.filter(email__startswith=f'loadtest-{tag}-').delete()
+            product.delete()
+            category.delete()
+            seller.delete()
+
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('Final stock matches the successful checkouts.'))
+        else:
+            self.stdout.write(self.style.ERROR('Final stock does NOT match the successful checkouts.'))
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from order.gateway import GatewayError, SSLCommerzClient
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire validation calls at the SSLCommerz endpoint (or a local stub via --base-url) '
+        'through the pooled client and print latency metrics and the breaker state.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Defaults to SSLCOMMERZ_BASE_URL / sandbox')
+        parser.add_argument('--calls', type=int, default=20)
+        parser.add_argument('--val-id', default='probe')
+
+    def handle(self, *args, **options):
+        client = SSLCommerzClient(base_url=options['base_url'])
+        failures = 0
+        for _ in range(options['calls']):
+            try:
+                client.validate(options['val_id'])
+            except GatewayError:
+                failures += 1
+
+        self.stdout.write(json.dumps(client.metrics.snapshot(), indent=2))
+        self.stdout.write(f'base url: {client.base_url}  failures: {failures}  breaker: {client.breaker.state}')
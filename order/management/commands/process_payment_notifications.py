@@ -0,0 +1,36 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from order.notifications import PaymentNotificationProcessor
+
+
+class Command(BaseCommand):
+    help = 'Validate queued SSLCommerz IPNs in parallel and mark the paid orders Ready To Ship'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Parallel gateway validations')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the queue is empty')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        processor = PaymentNotificationProcessor(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'],
+        )
+        while True:
+            started = time.perf_counter()
+            processed = processor.report['processed']
+            report = processor.drain()
+            if not options['loop']:
+                break
+            if report['processed'] != processed:
+                self.stdout.write(json.dumps(report))
+            time.sleep(max(0, options['interval'] - (time.perf_counter() - started)))
+
+        self.stdout.write(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'{report["processed"]} notification(s) processed, {report["paid"]} order(s) paid.'))
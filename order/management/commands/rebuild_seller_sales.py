@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from order.projections import SellerSalesRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the seller daily sales rollup from order items (all days, or --since/--until)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='First day, YYYY-MM-DD')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day, YYYY-MM-DD')
+        parser.add_argument('--seller', type=int, help='Only this seller (user id)')
+
+    def handle(self, *args, **options):
+        if options['since'] and options['until'] and options['since'] > options['until']:
+            raise CommandError('--since must not be after --until.')
+        rows = SellerSalesRollup.rebuild(since=options['since'], until=options['until'], seller=options['seller'])
+        self.stdout.write(self.style.SUCCESS(f'{rows} daily sales row(s) written.'))
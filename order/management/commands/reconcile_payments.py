@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from order.models import Payment
+from order.payments import PaymentReconciler
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-validate payments with SSLCommerz in bounded concurrent batches, update the ledger '
+        'and report payments whose amount or order status does not match the order'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='append', dest='statuses',
+                            choices=[choice for choice, _ in Payment.STATUS_CHOICES if choice != Payment.INITIATED],
+                            help=f'Ledger status to check, repeatable (default: {Payment.PENDING})')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent gateway validations')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--limit', type=int, help='Stop after this many payments')
+
+    def handle(self, *args, **options):
+        reconciler = PaymentReconciler(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            statuses=options['statuses'] or [Payment.PENDING],
+        )
+        report = reconciler.run(limit=options['limit'])
+
+        self.stdout.write(json.dumps(report, indent=2))
+        style = self.style.WARNING if report['mismatches'] or report['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{report["checked"]} checked: {report["valid"]} valid, {report["invalid"]} invalid, '
+            f'{report["mismatch"]} amount mismatches, {len(report["mismatches"])} to review, {report["errors"]} gateway errors.'
+        ))
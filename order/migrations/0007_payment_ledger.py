@@ -0,0 +1,34 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_payment_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tran_id', models.CharField(db_index=True, max_length=64)),
+                ('val_id', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('paid_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('currency', models.CharField(default='BDT', max_length=10)),
+                ('status', models.CharField(choices=[('initiated', 'Initiated'), ('pending', 'Pending validation'), ('valid', 'Valid'), ('invalid', 'Invalid'), ('mismatch', 'Amount mismatch')], default='initiated', max_length=20)),
+                ('gateway_response', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('validated_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='order.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='payment_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:41
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_unit_prices(apps, schema_editor):
+    CartItem = apps.get_model('order', 'CartItem')
+    Product = apps.get_model('product', 'Product')
+
+    CartItem.objects.update(
+        unit_price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0007_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(populate_unit_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_seller_order_lines(apps, schema_editor):
+    OrderItem = apps.get_model('order', 'OrderItem')
+    SellerOrderLine = apps.get_model('order', 'SellerOrderLine')
+
+    shares = (
+        OrderItem.objects.filter(product__seller__isnull=False)
+        .values('order_id', 'order__status', 'order__created_at', 'product__seller_id')
+        .annotate(line_count=Count('id'), quantity=Sum('quantity'), total=Sum('total_price'))
+        .order_by()
+    )
+    batch = []
+    for share in shares.iterator(chunk_size=2000):
+        batch.append(SellerOrderLine(
+            seller_id=share['product__seller_id'],
+            order_id=share['order_id'],
+            status=share['order__status'],
+            created_at=share['order__created_at'],
+            line_count=share['line_count'],
+            quantity=share['quantity'],
+            total=share['total'],
+        ))
+        if len(batch) >= 2000:
+            SellerOrderLine.objects.bulk_create(batch)
+            batch = []
+    SellerOrderLine.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0008_cartitem_unit_price'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerOrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Not Paid', 'Not Paid'), ('Shipped', 'Shipped'), ('Ready To Ship', 'Ready To Ship'), ('Delivered', 'Delivered'), ('Canceled', 'Canceled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('line_count', models.PositiveIntegerField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_lines', to='order.order')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_lines', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', '-created_at'], name='seller_line_created_idx'), models.Index(fields=['seller', 'status', '-created_at'], name='seller_line_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('seller', 'order'), name='seller_order_line_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_seller_order_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0010_seller_daily_sales'),
+    ]
+
+    operations = [
+        # OrderStatsService ranges over every status at once: (status, created_at)
+        # needs one range scan per status and order_not_paid_idx only covers unpaid rows
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+    ]
@@ -19,6 +19,8 @@ class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product,on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    # product price when the line was added/last changed, to flag price moves
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     
     class Meta:
         unique_together = [['cart','product']]
@@ -52,6 +54,23 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # purchase history: orders of one user, newest first
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            # admin / fulfilment queues by status
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # store-wide date ranges (admin order stats); the status-led and
+            # unpaid-only indexes cannot serve a range across all statuses
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            # unpaid orders only (payment session + IPN lookups, reconciliation)
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='Not Paid'),
+                name='order_not_paid_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Order {self.id} by {self.user.first_name} - status: {self.status}."
 
@@ -84,4 +103,163 @@ class Wishlist(models.Model):
     class Meta:
         unique_together = ['user', 'product']
     def __str__(self):
-        return f"{self.user.email} → {self.product.name}"
\ No newline at end of file
+        return f"{self.user.email} → {self.product.name}"
+
+class IdempotencyKey(models.Model):
+    """
+    First response for an `Idempotency-Key` header, per user and endpoint.
+    `status_code` stays null while the first request is still running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='idempotency_user_scope_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key} by {self.user_id}"
+
+
+class PaymentNotification(models.Model):
+    """
+    Outbox of SSLCommerz IPNs: stored on receipt, validated and applied to
+    the order later by `process_payment_notifications`.
+    """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    VALID = 'valid'
+    INVALID = 'invalid'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (VALID, 'Valid'),
+        (INVALID, 'Invalid'),
+        (FAILED, 'Failed'),
+    ]
+
+    tran_id = models.CharField(max_length=64)
+    val_id = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # the gateway may resend the same IPN; keep one row per attempt
+            models.UniqueConstraint(fields=['tran_id', 'val_id'], name='payment_notification_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payment_notification_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"IPN {self.tran_id} ({self.status})"
+
+
+class Payment(models.Model):
+    """
+    Ledger of payment attempts: one row when a gateway session is opened,
+    filled in by the IPN (`val_id`) and by validation (`paid_amount`,
+    gateway response). Orders keep their own status; this is the audit trail.
+    """
+    INITIATED = 'initiated'
+    PENDING = 'pending'
+    VALID = 'valid'
+    INVALID = 'invalid'
+    MISMATCH = 'mismatch'
+    STATUS_CHOICES = [
+        (INITIATED, 'Initiated'),
+        (PENDING, 'Pending validation'),
+        (VALID, 'Valid'),
+        (INVALID, 'Invalid'),
+        (MISMATCH, 'Amount mismatch'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='payments')
+    tran_id = models.CharField(max_length=64, db_index=True)
+    val_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(max_length=10, default='BDT')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=INITIATED)
+    gateway_response = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    validated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Payment {self.tran_id} ({self.status})"
+
+
+class SellerOrderLine(models.Model):
+    """
+    Seller's share of an order, one row per (seller, order), so the seller
+    dashboard is an indexed range read instead of an Order/OrderItem/Product
+    join. Written with the order and kept in step with its status by
+    order/signals.py.
+    """
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='order_lines')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='seller_lines')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    # copied from the order
+    created_at = models.DateTimeField()
+    line_count = models.PositiveIntegerField()
+    quantity = models.PositiveIntegerField()
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'order'], name='seller_order_line_uniq'),
+        ]
+        indexes = [
+            # dashboard pages, newest first, optionally by status
+            models.Index(fields=['seller', '-created_at'], name='seller_line_created_idx'),
+            models.Index(fields=['seller', 'status', '-created_at'], name='seller_line_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id} for seller {self.seller_id}"
+
+
+class SellerDailySales(models.Model):
+    """
+    Daily sales rollup per seller and product (orders that were not
+    canceled), kept incrementally by OrderService and rebuilt with
+    `rebuild_seller_sales`. Answers the seller analytics endpoint.
+    """
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    order_count = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'product', 'date'], name='seller_daily_sales_uniq'),
+        ]
+        indexes = [
+            # date-range reads of one seller
+            models.Index(fields=['seller', 'date'], name='seller_sales_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} product {self.product_id}: {self.quantity} sold"
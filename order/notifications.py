@@ -0,0 +1,186 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from order import gateway, payments
+from order.models import Order, Payment, PaymentNotification
+from order.signals import orders_status_changed
+
+
+# IPN fields kept with the notification for auditing
+PAYLOAD_FIELDS = ('status', 'amount', 'currency', 'card_type', 'bank_tran_id', 'tran_date')
+
+
+def _notification(tran_id, val_id, data):
+    return PaymentNotification(tran_id=tran_id, val_id=val_id, payload={
+        key: data.get(key) for key in PAYLOAD_FIELDS if data.get(key) is not None
+    })
+
+
+def _payable(tran_id):
+    order_id = payments.order_id_from(tran_id)
+    if order_id is None:
+        return None
+    return Order.objects.filter(pk=order_id, status=Order.NOT_PAID)
+
+
+def is_payable(tran_id):
+    """Whether `tran_id` names an order still waiting for payment (checked before queueing)."""
+    orders = _payable(tran_id)
+    return orders is not None and orders.exists()
+
+
+async def ais_payable(tran_id):
+    orders = _payable(tran_id)
+    return orders is not None and await orders.aexists()
+
+
+def enqueue(tran_id, val_id, data):
+    """
+    Store an IPN and note its `val_id` on the payment ledger; a resend of
+    the same (tran_id, val_id) is a no-op.
+    """
+    with transaction.atomic():
+        PaymentNotification.objects.bulk_create([_notification(tran_id, val_id, data)], ignore_conflicts=True)
+        payments.record_notification(tran_id, val_id, data)
+
+
+async def aenqueue(tran_id, val_id, data):
+    await sync_to_async(enqueue)(tran_id, val_id, data)
+
+
+class PaymentNotificationProcessor:
+    """
+    Drains the IPN outbox.
+     - claim(): lock a batch of pending rows (SKIP LOCKED, so several
+       workers can run) and mark them processing
+     - verify(): validate the batch with the gateway from a thread pool
+     - apply(): one transaction per batch that flips every verified order
+       to READY_TO_SHIP with a single UPDATE and stores the outcomes on
+       the notifications and the payment ledger; a payment below the
+       order total is not accepted
+    Gateway errors put the row back in the queue, retried after
+    `retry_delay` seconds until `max_attempts`.
+    """
+
+    def __init__(self, workers=8, batch_size=100, max_attempts=5, retry_delay=30, stale_after=300):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stale_after = stale_after
+        self.report = {'processed': 0, 'paid': 0, 'invalid': 0, 'retry': 0, 'failed': 0}
+
+    def claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                PaymentNotification.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=PaymentNotification.PENDING, attempts=0)
+                    | Q(status=PaymentNotification.PENDING, updated_at__lt=now - timedelta(seconds=self.retry_delay))
+                    # a worker died mid-batch
+                    | Q(status=PaymentNotification.PROCESSING, updated_at__lt=now - timedelta(seconds=self.stale_after))
+                )
+                .order_by('created_at')[:self.batch_size]
+            )
+            if rows:
+                PaymentNotification.objects.filter(pk__in=[row.pk for row in rows]).update(
+                    status=PaymentNotification.PROCESSING,
+                    attempts=F('attempts') + 1,
+                    updated_at=Now(),
+                )
+        for row in rows:
+            row.attempts += 1
+        return rows
+
+    def _verify_one(self, row):
+        try:
+            return row, gateway.get_client().validate(row.val_id), None
+        except gateway.GatewayError as exc:
+            return row, None, str(exc)
+
+    def verify(self, rows):
+        # the same val_id is only sent to the gateway once per batch
+        unique = {}
+        for row in rows:
+            unique.setdefault(row.val_id, row)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = {row.val_id: (verification, error) for row, verification, error in pool.map(self._verify_one, unique.values())}
+        return [(row, *results[row.val_id]) for row in rows]
+
+    def apply(self, results):
+        now = timezone.now()
+        order_ids = {payments.order_id_from(row.tran_id) for row, verification, _ in results if verification} - {None}
+        totals = dict(Order.objects.filter(pk__in=order_ids).values_list('id', 'total_price'))
+        ledger = {
+            (payment.tran_id, payment.val_id): payment
+            for payment in Payment.objects.filter(val_id__in={row.val_id for row, _, _ in results})
+        }
+        checked = []
+        paid = set()
+        for row, verification, error in results:
+            row.updated_at = now
+            if error is not None:
+                row.status = PaymentNotification.PENDING if row.attempts < self.max_attempts else PaymentNotification.FAILED
+                row.last_error = error[:255]
+                self.report['retry' if row.status == PaymentNotification.PENDING else 'failed'] += 1
+                continue
+
+            row.processed_at = now
+            order_id = payments.order_id_from(row.tran_id)
+            if verification.get('tran_id', row.tran_id) != row.tran_id or order_id not in totals:
+                outcome = Payment.INVALID
+            else:
+                outcome = payments.verdict(verification, totals[order_id])
+
+            payment = ledger.get((row.tran_id, row.val_id))
+            if payment is not None:
+                payments.apply_verification(payment, verification, totals.get(order_id), now)
+                payment.status = outcome
+                checked.append(payment)
+
+            if outcome == Payment.VALID:
+                row.status = PaymentNotification.VALID
+                row.last_error = ''
+                paid.add(order_id)
+            else:
+                row.status = PaymentNotification.INVALID
+                if outcome == Payment.MISMATCH:
+                    row.last_error = (
+                        f'Paid {verification.get("amount")} {verification.get("currency")} '
+                        'does not cover the order total'
+                    )[:255]
+                else:
+                    row.last_error = f'Payment verification failed: {verification.get("status")}'[:255]
+                self.report['invalid'] += 1
+
+        with transaction.atomic():
+            if paid:
+                self.report['paid'] += Order.objects.filter(pk__in=paid, status=Order.NOT_PAID).update(
+                    status=Order.READY_TO_SHIP, updated_at=Now(),
+                )
+                orders_status_changed.send(sender=Order, order_ids=paid)
+            PaymentNotification.objects.bulk_update(
+                [row for row, _, _ in results],
+                ['status', 'last_error', 'processed_at', 'updated_at'],
+            )
+            Payment.objects.bulk_update(checked, payments.LEDGER_UPDATE_FIELDS)
+        self.report['processed'] += len(results)
+
+    def run_once(self):
+        """Process one batch; returns the number of notifications handled."""
+        rows = self.claim()
+        if rows:
+            self.apply(self.verify(rows))
+        return len(rows)
+
+    def drain(self):
+        while self.run_once():
+            pass
+        return self.report
@@ -0,0 +1,180 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.utils import timezone
+
+from order import gateway
+from order.models import Order, Payment
+
+
+# orders are priced and paid in BDT (see gateway.session_payload)
+CURRENCY = 'BDT'
+
+# gateway fields worth keeping on the ledger row (never credentials)
+SESSION_FIELDS = ('status', 'failedreason', 'sessionkey', 'GatewayPageURL')
+VALIDATION_FIELDS = (
+    'status', 'tran_id', 'val_id', 'amount', 'store_amount', 'currency', 'currency_type',
+    'currency_amount', 'bank_tran_id', 'card_type', 'tran_date', 'risk_level', 'risk_title',
+)
+
+
+def _subset(data, fields):
+    return {key: data[key] for key in fields if data.get(key) is not None}
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def order_id_from(tran_id):
+    try:
+        return uuid.UUID(str(tran_id))
+    except ValueError:
+        return None
+
+
+def session_payment(order, response):
+    """Ledger row for a freshly opened gateway session."""
+    return Payment(
+        order=order,
+        tran_id=str(order.id),
+        amount=order.total_price,
+        currency=CURRENCY,
+        gateway_response=_subset(response or {}, SESSION_FIELDS),
+    )
+
+
+def record_notification(tran_id, val_id, data):
+    """
+    Attach an IPN's `val_id` to the open ledger row of the transaction, or
+    start a new row (a retried payment, or no session row yet).
+    """
+    if Payment.objects.filter(tran_id=tran_id, val_id=val_id).exists():
+        # a resent IPN: the val_id is already on the ledger
+        return
+    paid_amount = _decimal(data.get('amount'))
+    # only the newest open session: earlier attempts keep their own rows
+    newest_open = (
+        Payment.objects.filter(tran_id=tran_id, val_id__isnull=True)
+        .order_by('-created_at', '-pk').values('pk')[:1]
+    )
+    updated = Payment.objects.filter(pk=Subquery(newest_open)).update(
+        val_id=val_id, paid_amount=paid_amount, status=Payment.PENDING, updated_at=timezone.now(),
+    )
+    if not updated:
+        order_id = order_id_from(tran_id)
+        Payment.objects.create(
+            order_id=order_id if order_id and Order.objects.filter(pk=order_id).exists() else None,
+            tran_id=tran_id, val_id=val_id, paid_amount=paid_amount,
+            currency=CURRENCY, status=Payment.PENDING,
+        )
+
+
+def verdict(verification, expected):
+    """
+    Ledger status for a validation response: VALID only when the gateway
+    says so, in CURRENCY, and the amount covers `expected` (the order
+    total).
+    """
+    if verification.get('status') not in ('VALID', 'VALIDATED'):
+        return Payment.INVALID
+    if str(verification.get('currency') or '').upper() != CURRENCY:
+        return Payment.MISMATCH
+    paid = _decimal(verification.get('amount'))
+    if expected is not None and (paid is None or paid < expected):
+        return Payment.MISMATCH
+    return Payment.VALID
+
+
+def apply_verification(payment, verification, expected, now):
+    payment.status = verdict(verification, expected)
+    payment.paid_amount = _decimal(verification.get('amount'))
+    payment.gateway_response = _subset(verification, VALIDATION_FIELDS)
+    payment.validated_at = now
+    payment.updated_at = now
+
+
+LEDGER_UPDATE_FIELDS = ['status', 'paid_amount', 'gateway_response', 'validated_at', 'updated_at']
+
+
+class PaymentReconciler:
+    """
+    Re-validates ledger rows with the gateway and compares the amounts with
+    `Order.total_price`.
+     - Rows are read in pk order, `batch_size` at a time
+     - Each batch is validated from a pool of `workers` threads and written
+       back with one bulk_update
+     - Mismatches (gateway amount below the order total or in another
+       currency, or a valid payment whose order is still Not Paid) are
+       collected for the report
+    """
+
+    def __init__(self, workers=8, batch_size=200, statuses=(Payment.PENDING,)):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.statuses = statuses
+        self.report = {'checked': 0, 'valid': 0, 'invalid': 0, 'mismatch': 0, 'errors': 0, 'mismatches': []}
+
+    def queryset(self):
+        return (
+            Payment.objects.filter(status__in=self.statuses)
+            .exclude(Q(val_id__isnull=True) | Q(val_id=''))
+            .select_related('order')
+            .order_by('pk')
+        )
+
+    def _validate(self, payment):
+        try:
+            return payment, gateway.get_client().validate(payment.val_id)
+        except gateway.GatewayError:
+            return payment, None
+
+    def reconcile_batch(self, payments):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self._validate, payments))
+
+        now = timezone.now()
+        checked = []
+        for payment, verification in results:
+            if verification is None:
+                self.report['errors'] += 1
+                continue
+            expected = payment.order.total_price if payment.order else None
+            apply_verification(payment, verification, expected, now)
+            checked.append(payment)
+            self.report[payment.status] += 1
+
+            unpaid = payment.status == Payment.VALID and payment.order and payment.order.status == Order.NOT_PAID
+            if payment.status == Payment.MISMATCH or unpaid:
+                self.report['mismatches'].append({
+                    'tran_id': payment.tran_id,
+                    'val_id': payment.val_id,
+                    'order_total': str(expected) if expected is not None else None,
+                    'paid_amount': str(payment.paid_amount) if payment.paid_amount is not None else None,
+                    'order_status': payment.order.status if payment.order else None,
+                    'issue': 'amount' if payment.status == Payment.MISMATCH else 'order not marked paid',
+                })
+
+        with transaction.atomic():
+            Payment.objects.bulk_update(checked, LEDGER_UPDATE_FIELDS)
+        self.report['checked'] += len(results)
+
+    def run(self, limit=None):
+        last_pk = 0
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+            payments = list(self.queryset().filter(pk__gt=last_pk)[:size])
+            if not payments:
+                break
+            self.reconcile_batch(payments)
+            last_pk = payments[-1].pk
+            if remaining is not None:
+                remaining -= len(payments)
+        return self.report
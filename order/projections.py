@@ -0,0 +1,222 @@
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from order.models import Order, OrderItem, SellerDailySales, SellerOrderLine
+
+
+class SellerOrderIndex:
+    """
+    Maintains `SellerOrderLine`, the per-seller projection of orders.
+     - record(): rows for a new order, from its items (one bulk insert)
+     - sync_status(): copy the order status after it changed (one UPDATE)
+     - totals(): per-seller order count, units and revenue
+    """
+
+    @staticmethod
+    def record(order, items):
+        """`items` are the order's OrderItems with `product` loaded."""
+        shares = {}
+        for item in items:
+            seller_id = item.product.seller_id
+            if seller_id is None:
+                continue
+            share = shares.setdefault(seller_id, {'line_count': 0, 'quantity': 0, 'total': 0})
+            share['line_count'] += 1
+            share['quantity'] += item.quantity
+            share['total'] += item.total_price
+
+        SellerOrderLine.objects.bulk_create([
+            SellerOrderLine(
+                seller_id=seller_id, order=order, status=order.status, created_at=order.created_at, **share,
+            )
+            for seller_id, share in shares.items()
+        ])
+
+    @staticmethod
+    def sync_status(order_ids):
+        SellerOrderLine.objects.filter(order_id__in=order_ids).update(
+            status=Subquery(Order.objects.filter(pk=OuterRef('order_id')).values('status')[:1])
+        )
+
+    @staticmethod
+    def totals(lines):
+        """Aggregates over a SellerOrderLine queryset; canceled orders bring no revenue."""
+        money = DecimalField(max_digits=14, decimal_places=2)
+        return lines.aggregate(
+            orders=Count('id'),
+            quantity=Coalesce(Sum('quantity'), 0),
+            revenue=Coalesce(Sum('total', filter=~Q(status=Order.CANCELED)), 0, output_field=money),
+        )
+
+    @staticmethod
+    def items(seller):
+        """The seller's own items of an order, for prefetching."""
+        return OrderItem.objects.filter(product__seller=seller).select_related('product')
+
+
+class SellerSalesRollup:
+    """
+    Maintains `SellerDailySales`, per (seller, product, day) sales of
+    orders that were not canceled.
+     - add(): fold a new order's items in (one upsert)
+     - remove(): take canceled orders back out (one read, one upsert)
+     - rebuild(): recompute a date range from OrderItem
+     - report(): series, totals and top products for a date range
+    """
+    batch_size = 500
+
+    @staticmethod
+    def _upsert(deltas):
+        """
+        `deltas` maps (seller_id, product_id, date) -> [orders, quantity, revenue];
+        added to the stored counters with INSERT ... ON CONFLICT DO UPDATE.
+        """
+        table = connection.ops.quote_name(SellerDailySales._meta.db_table)
+        date_field = SellerDailySales._meta.get_field('date')
+        rows = list(deltas.items())
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), SellerSalesRollup.batch_size):
+                batch = rows[start:start + SellerSalesRollup.batch_size]
+                params = []
+                for (seller_id, product_id, day), (orders, quantity, revenue) in batch:
+                    params += [seller_id, product_id, date_field.get_db_prep_value(day, connection), orders, quantity, revenue]
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} (seller_id, product_id, date, order_count, quantity, revenue)
+                    VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(batch))}
+                    ON CONFLICT (seller_id, product_id, date) DO UPDATE
+                    SET order_count = {table}.order_count + excluded.order_count,
+                        quantity = {table}.quantity + excluded.quantity,
+                        revenue = {table}.revenue + excluded.revenue
+                    """,
+                    params,
+                )
+
+    @staticmethod
+    def add(order, items):
+        """`items` are the order's OrderItems with `product` loaded."""
+        day = timezone.localdate(order.created_at)
+        deltas = {}
+        for item in items:
+            if item.product.seller_id is None:
+                continue
+            delta = deltas.setdefault((item.product.seller_id, item.product_id, day), [0, 0, 0])
+            delta[0] += 1
+            delta[1] += item.quantity
+            delta[2] += item.total_price
+        SellerSalesRollup._upsert(deltas)
+
+    @staticmethod
+    def remove(order_ids):
+        """Take orders that are being canceled out of the rollup."""
+        deltas = {}
+        items = OrderItem.objects.filter(order_id__in=order_ids, product__seller__isnull=False).values_list(
+            'product__seller_id', 'product_id', 'order__created_at', 'quantity', 'total_price',
+        )
+        for seller_id, product_id, created_at, quantity, total_price in items:
+            delta = deltas.setdefault((seller_id, product_id, timezone.localdate(created_at)), [0, 0, 0])
+            delta[0] -= 1
+            delta[1] -= quantity
+            delta[2] -= total_price
+        SellerSalesRollup._upsert(deltas)
+
+    @staticmethod
+    def rebuild(since=None, until=None, seller=None):
+        """Recompute the rollup rows of a date range (inclusive); returns the row count."""
+        rows = SellerDailySales.objects.all()
+        items = OrderItem.objects.filter(product__seller__isnull=False).exclude(order__status=Order.CANCELED)
+        if seller is not None:
+            rows = rows.filter(seller=seller)
+            items = items.filter(product__seller=seller)
+        if since is not None:
+            rows = rows.filter(date__gte=since)
+            items = items.filter(order__created_at__gte=_day_start(since))
+        if until is not None:
+            rows = rows.filter(date__lte=until)
+            items = items.filter(order__created_at__lt=_day_start(until + timedelta(days=1)))
+
+        sales = (
+            items.annotate(day=TruncDate('order__created_at'))
+            .values('product__seller_id', 'product_id', 'day')
+            .annotate(order_count=Count('order_id', distinct=True), quantity=Sum('quantity'), revenue=Sum('total_price'))
+            .order_by()
+        )
+        created = 0
+        with transaction.atomic():
+            rows.delete()
+            batch = []
+            for sale in sales.iterator(chunk_size=2000):
+                batch.append(SellerDailySales(
+                    seller_id=sale['product__seller_id'], product_id=sale['product_id'], date=sale['day'],
+                    order_count=sale['order_count'], quantity=sale['quantity'], revenue=sale['revenue'],
+                ))
+                if len(batch) >= 2000:
+                    created += len(SellerDailySales.objects.bulk_create(batch))
+                    batch = []
+            created += len(SellerDailySales.objects.bulk_create(batch))
+        return created
+
+    @staticmethod
+    def report(seller, start, end, interval='day', top=10):
+        """
+        Revenue, units and orders per day or week (Monday) between `start`
+        and `end`, zero-filled, plus totals and the top products by revenue.
+        Three grouped queries over (seller, date) ranges.
+        """
+        sales = SellerDailySales.objects.filter(seller=seller, date__range=(start, end))
+        per_day = {
+            row['date']: row
+            for row in sales.values('date').annotate(revenue=Sum('revenue'), quantity=Sum('quantity')).order_by()
+        }
+        # distinct orders per day come from the seller order lines
+        orders_per_day = dict(
+            SellerOrderLine.objects.filter(
+                seller=seller, created_at__gte=_day_start(start), created_at__lt=_day_start(end + timedelta(days=1)),
+            )
+            .exclude(status=Order.CANCELED)
+            .annotate(day=TruncDate('created_at')).values('day')
+            .annotate(orders=Count('id')).order_by().values_list('day', 'orders')
+        )
+
+        def period_of(day):
+            return day - timedelta(days=day.weekday()) if interval == 'week' else day
+
+        series = {}
+        day = start
+        while day <= end:
+            period = series.setdefault(period_of(day), {'period': period_of(day), 'revenue': 0, 'quantity': 0, 'orders': 0})
+            if day in per_day:
+                period['revenue'] += per_day[day]['revenue']
+                period['quantity'] += per_day[day]['quantity']
+            period['orders'] += orders_per_day.get(day, 0)
+            day += timedelta(days=1)
+        series = list(series.values())
+
+        top_products = list(
+            sales.values('product_id', 'product__name')
+            .annotate(revenue=Sum('revenue'), quantity=Sum('quantity'))
+            .filter(quantity__gt=0)
+            .order_by('-revenue', 'product_id')[:top]
+        )
+        return {
+            'start': start,
+            'end': end,
+            'interval': interval,
+            'totals': {
+                key: sum(period[key] for period in series) for key in ('revenue', 'quantity', 'orders')
+            },
+            'series': series,
+            'top_products': [
+                {'product_id': row['product_id'], 'name': row['product__name'],
+                 'revenue': row['revenue'], 'quantity': row['quantity']}
+                for row in top_products
+            ],
+        }
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.db.models.functions import Now
+from rest_framework.exceptions import ValidationError
+
+from product.models import Product
+from product.signals import products_bulk_changed
+
+
+class InsufficientStock(ValidationError):
+    """Raised with the lines that could not be reserved, nothing is decremented."""
+
+    def __init__(self, failed):
+        self.failed = failed
+        names = ', '.join(f'"{line["name"]}"' for line in failed)
+        super().__init__({'detail': f'Insufficient stock for {names}.'})
+        # ValidationError turns every value into a string; keep the numbers
+        self.detail['items'] = failed
+
+
+class _Shortfall(Exception):
+    pass
+
+
+class StockReservation:
+    """
+    Stock moves for checkout and cancellation without row-by-row saves.
+     - reserve(): one `UPDATE ... SET stock = stock - q WHERE stock >= q`
+       for every line at once; all lines succeed or none do
+     - release(): one `UPDATE ... SET stock = stock + q`
+    `lines` maps product id -> quantity. Both read back which products went
+    out of (or back into) stock, so category counters move by a delta.
+    """
+
+    @staticmethod
+    def _per_product(lines):
+        return Case(
+            *(When(pk=product_id, then=Value(quantity)) for product_id, quantity in lines.items()),
+            output_field=PositiveIntegerField(),
+        )
+
+    @staticmethod
+    def _in_stock_deltas(crossed, step):
+        """category id -> in_stock_count change for the products that crossed zero."""
+        deltas = {}
+        for category_id in crossed.values_list('category_id', flat=True):
+            deltas[category_id] = deltas.get(category_id, 0) + step
+        return deltas
+
+    @staticmethod
+    def reserve(lines):
+        lines = {product_id: quantity for product_id, quantity in lines.items() if quantity > 0}
+        if not lines:
+            return
+
+        requested = StockReservation._per_product(lines)
+        try:
+            with transaction.atomic():
+                updated = Product.objects.filter(pk__in=lines, stock__gte=requested).update(
+                    stock=F('stock') - requested,
+                    updated_at=Now(),
+                )
+                if updated != len(lines):
+                    raise _Shortfall
+        except _Shortfall:
+            raise InsufficientStock(StockReservation.shortfall(lines))
+
+        sold_out = Product.objects.filter(pk__in=lines, stock=0)
+        products_bulk_changed.send(
+            sender=Product, product_ids=list(lines), fields=['stock'],
+            in_stock_deltas=StockReservation._in_stock_deltas(sold_out, -1),
+        )
+
+    @staticmethod
+    def shortfall(lines):
+        """Lines whose product is gone or has less stock than requested."""
+        available = {
+            row['id']: row
+            for row in Product.objects.filter(pk__in=lines).values('id', 'name', 'stock')
+        }
+        failed = []
+        for product_id, quantity in lines.items():
+            row = available.get(product_id)
+            if row is None or row['stock'] < quantity:
+                failed.append({
+                    'product_id': product_id,
+                    'name': row['name'] if row else str(product_id),
+                    'requested': quantity,
+                    'available': row['stock'] if row else 0,
+                })
+        return failed
+
+    @staticmethod
+    def release(lines):
+        lines = {product_id: quantity for product_id, quantity in lines.items() if quantity > 0}
+        if not lines:
+            return
+        returned = StockReservation._per_product(lines)
+        Product.objects.filter(pk__in=lines).update(
+            stock=F('stock') + returned,
+            updated_at=Now(),
+        )
+        # stock equal to what came back: it was 0 before
+        restocked = Product.objects.filter(pk__in=lines, stock=StockReservation._per_product(lines))
+        products_bulk_changed.send(
+            sender=Product, product_ids=list(lines), fields=['stock'],
+            in_stock_deltas=StockReservation._in_stock_deltas(restocked, 1),
+        )
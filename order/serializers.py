@@ -1,8 +1,11 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
-from order.models import Cart, CartItem,Order,OrderItem, Wishlist
+from order.models import Cart, CartItem,Order,OrderItem, SellerOrderLine, Wishlist
 from product.models import Product
 from product.serializers import ProductSerializer
-from order.services import OrderService
+from order.services import CartService, OrderService
 
 class SimpleProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,24 +19,11 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         fields = ['id','product_id','quantity']
 
     def save(self,**kwargs):
-        # print("Serializer context:", self.context)
-        # print("Validated data:", self.validated_data)
-        cart_id = self.context['cart_id']
-        product_id = self.validated_data['product_id']
-        quantity = self.validated_data['quantity']
-
-        try:
-            cart_item = CartItem.objects.get(cart_id= cart_id, product_id = product_id)
-            cart_item.quantity += quantity
-            self.instance=cart_item.save()
-        except CartItem.DoesNotExist:
-            self.instance=CartItem.objects.create(cart_id=cart_id, **self.validated_data)
+        # one INSERT ... ON CONFLICT DO UPDATE, capped by the product's stock
+        self.instance = CartService.add_item(
+            self.context['cart_id'], self.validated_data['product_id'], self.validated_data['quantity'],
+        )
         return self.instance
-    
-    def validate_product_id(self, value):
-        if not Product.objects.filter(pk=value).exists():
-            raise serializers.ValidationError(f"Product with id {value} does not exist!")
-        return value
 
 class CartItemSerializer(serializers.ModelSerializer):
     # product = ProductSerializer()
@@ -41,31 +31,95 @@ class CartItemSerializer(serializers.ModelSerializer):
     product = SimpleProductSerializer()
     # product_price = serializers.SerializerMethodField(method_name='get_product_price')
     total_price = serializers.SerializerMethodField(method_name='get_total_price')
+    # staleness flags, so the app can warn before checkout
+    price_changed = serializers.SerializerMethodField()
+    available_stock = serializers.IntegerField(source='product.stock', read_only=True)
+    insufficient_stock = serializers.SerializerMethodField()
     class Meta:
         model = CartItem
         # fields=['id','product','quantity', 'product_price']
-        fields=['id','product','quantity','total_price']
+        fields=['id','product','quantity','total_price','unit_price','price_changed','available_stock','insufficient_stock']
+        read_only_fields = ['unit_price']
 
     # def get_product_price(self,cart_item):
     #     return cart_item.product.price
 
     def get_total_price(self,cart_item:CartItem):
+        # annotated by CartService.lines()
+        if hasattr(cart_item, 'line_total'):
+            return cart_item.line_total
         return cart_item.quantity * cart_item.product.price
 
+    def get_price_changed(self, cart_item:CartItem):
+        return cart_item.unit_price is not None and cart_item.unit_price != cart_item.product.price
+
+    def get_insufficient_stock(self, cart_item:CartItem):
+        return cart_item.quantity > cart_item.product.stock
+
 class CartSerializer(serializers.ModelSerializer):
-    items = CartItemSerializer(many=True,read_only=True)
+    items = serializers.SerializerMethodField(method_name='get_items')
     total_price = serializers.SerializerMethodField(method_name='get_total_price')
+    line_count = serializers.SerializerMethodField()
+    item_count = serializers.SerializerMethodField()
+    has_changes = serializers.SerializerMethodField()
     class Meta:
         model = Cart
         # fields = ['id','user','items','total_price']
-        fields = ['id','items','total_price']
+        fields = ['id','items','total_price','line_count','item_count','has_changes']
         # read_only_fields = ['user']
+
+    def _lines(self, cart:Cart):
+        # CartService sets `lines` and the totals from one annotated query
+        lines = getattr(cart, 'lines', None)
+        if lines is None:
+            lines = cart.lines = list(cart.items.select_related('product'))
+        return lines
+
+    def get_items(self, cart:Cart):
+        return CartItemSerializer(self._lines(cart), many=True, context=self.context).data
+
     def get_total_price(self,cart:Cart):
-        # list=[item.product.price * item.quantity for item in cart.items.all()]
-        list=[item.product.price * item.quantity for item in cart.items.all()]
-        # print('list',list)
-        total = sum(list)
-        return total
+        if hasattr(cart, 'total'):
+            return cart.total
+        return sum(item.product.price * item.quantity for item in self._lines(cart))
+
+    def get_line_count(self, cart:Cart):
+        if hasattr(cart, 'line_count'):
+            return cart.line_count
+        return len(self._lines(cart))
+
+    def get_item_count(self, cart:Cart):
+        if hasattr(cart, 'item_count'):
+            return cart.item_count
+        return sum(item.quantity for item in self._lines(cart))
+
+    def get_has_changes(self, cart:Cart):
+        return any(
+            (item.unit_price is not None and item.unit_price != item.product.price)
+            or item.quantity > item.product.stock
+            for item in self._lines(cart)
+        )
+
+
+class CartItemOperationSerializer(serializers.Serializer):
+    ADD = 'add'
+    SET = 'set'
+    REMOVE = 'remove'
+    op = serializers.ChoiceField(choices=[ADD, SET, REMOVE])
+    product_id = serializers.IntegerField()
+    # `set` to 0 removes the line; `remove` takes no quantity
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] != self.REMOVE and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': 'This field is required.'})
+        if attrs['op'] == self.ADD and attrs['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': 'Ensure this value is greater than or equal to 1.'})
+        return attrs
+
+
+class CartItemBatchSerializer(serializers.Serializer):
+    operations = CartItemOperationSerializer(many=True, allow_empty=False, max_length=200)
 
 
 class UpdateCartItemSerializer(serializers.ModelSerializer):
@@ -73,6 +127,10 @@ class UpdateCartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ['quantity']
 
+    def update(self, instance, validated_data):
+        # capped by the product's stock; re-confirms the current price
+        return CartService.set_quantity(instance, validated_data.get('quantity', instance.quantity))
+
 
 class EmptySerializer(serializers.Serializer):
     pass
@@ -89,6 +147,18 @@ class UpdateOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['status']
+
+    def update(self, instance, validated_data):
+        new_status = validated_data.get('status', instance.status)
+        if new_status == instance.status:
+            return instance
+        if instance.status == Order.CANCELED:
+            raise serializers.ValidationError({'detail': 'Order already canceled'})
+        if new_status == Order.CANCELED:
+            # refund, restock and seller rollups move with the status
+            return OrderService.cancel_order(order=instance, user=self.context['user'])
+        return super().update(instance, validated_data)
+
     # def update(self, instance, validated_data):
     #     user = self.cotext['user']
     #     new_status = validated_data['status']
@@ -178,11 +248,17 @@ class SellerOrderItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'quantity', 'price', 'total_price']
 
 class SellerOrderSerializer(serializers.ModelSerializer):
-    items = SellerOrderItemSerializer(source='seller_items', many=True)
+    # a SellerOrderLine with its order; `id` stays the order id
+    id = serializers.UUIDField(source='order_id', read_only=True)
+    user = serializers.PrimaryKeyRelatedField(source='order.user', read_only=True)
+    total_price = serializers.DecimalField(source='order.total_price', max_digits=10, decimal_places=2, read_only=True)
+    seller_total = serializers.DecimalField(source='total', max_digits=12, decimal_places=2, read_only=True)
+    seller_quantity = serializers.IntegerField(source='quantity', read_only=True)
+    items = SellerOrderItemSerializer(source='order.seller_items', many=True, read_only=True)
 
     class Meta:
-        model = Order
-        fields = ['id', 'user', 'status', 'total_price', 'created_at', 'items']
+        model = SellerOrderLine
+        fields = ['id', 'user', 'status', 'total_price', 'created_at', 'seller_total', 'seller_quantity', 'items']
 
 class SSLCommerzPaymentSerializer(serializers.Serializer):
     order_id = serializers.UUIDField()
@@ -198,4 +274,35 @@ class SSLCommerzPaymentSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 "Order not found, does not belong to you, or is no longer payable."
             )
-        return value
\ No newline at end of file
+        return value
+
+
+class DateRangeQuerySerializer(serializers.Serializer):
+    MAX_DAYS = 731
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        # default range: the last 30 days
+        attrs['end'] = attrs.get('end') or timezone.localdate()
+        attrs['start'] = attrs.get('start') or attrs['end'] - timedelta(days=29)
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': 'Must not be after end.'})
+        if (attrs['end'] - attrs['start']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError({'start': f'Ranges are limited to {self.MAX_DAYS} days.'})
+        return attrs
+
+
+class SellerAnalyticsQuerySerializer(DateRangeQuerySerializer):
+    DAY = 'day'
+    WEEK = 'week'
+
+    interval = serializers.ChoiceField(choices=[DAY, WEEK], default=DAY)
+    top = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    # admins only: whose sales to report
+    seller = serializers.IntegerField(required=False)
+
+
+class OrderStatsQuerySerializer(DateRangeQuerySerializer):
+    top = serializers.IntegerField(min_value=1, max_value=50, default=10)
@@ -73,8 +73,16 @@
 #         return order
 
 
-from order.models import Order, OrderItem, Cart
-from django.db import transaction
+from order.models import Order, OrderItem, Cart, CartItem
+from order.projections import SellerOrderIndex, SellerSalesRollup
+from order.reservations import InsufficientStock, StockReservation
+from order.signals import orders_status_changed
+from product.models import Product
+from datetime import datetime, time, timedelta
+from django.db import connection, transaction
+from django.db.models import Avg, Case, Count, DecimalField, ExpressionWrapper, F, Sum, Value, When, Window
+from django.db.models.functions import Now, TruncDate
+from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from users.models import User
 
@@ -83,87 +91,400 @@ class OrderService:
 
     @staticmethod
     def create_order(user_id, cart_id):
+        """
+        Place an order with a fixed number of queries, whatever the cart size:
+        one locked read of the cart lines, one guarded balance debit, one
+        conditional stock UPDATE, one order insert, one bulk insert of the
+        items, one of the seller order lines, one upsert of the daily sales
+        rollup and the cart delete.
+        """
         with transaction.atomic():
 
-            user = User.objects.select_for_update().get(pk=user_id)
-            cart = Cart.objects.select_for_update().get(pk=cart_id)
-            cart_items = cart.items.select_related('product').select_for_update()
-            if not cart_items.exists():
+            # lock the cart lines only; product rows are never locked here,
+            # stock is taken by one conditional UPDATE below
+            cart_items = list(
+                CartItem.objects.filter(cart_id=cart_id, cart__user_id=user_id)
+                .select_related('product')
+                .select_for_update(of=('self',))
+            )
+            if not cart_items:
                 raise ValidationError({'detail': 'Cart is empty.'})
-            total_price = 0
-            order_items = []
-            for item in cart_items:
-                product = item.product
-
-                if product.stock < item.quantity:
-                    raise ValidationError({
-                        'detail': f'Insufficient stock for "{product.name}".'
-                    })
 
-                item_total = product.price * item.quantity
-                total_price += item_total
+            total_price = sum(item.product.price * item.quantity for item in cart_items)
 
-            if user.balance < total_price:
+            debited = User.objects.filter(pk=user_id, balance__gte=total_price).update(
+                balance=F('balance') - total_price
+            )
+            if not debited:
                 raise ValidationError({'detail': 'Insufficient balance.'})
 
-            user.balance -= total_price
-            user.save()
+            StockReservation.reserve({item.product_id: item.quantity for item in cart_items})
 
             order = Order.objects.create(
-                user=user,
+                user_id=user_id,
                 total_price=total_price
             )
 
-            for item in cart_items:
-                product = item.product
-
-                product.stock -= item.quantity
-                product.save()
-
-                order_items.append(
-                    OrderItem(
-                        order=order,
-                        product=product,
-                        price=product.price,
-                        quantity=item.quantity,
-                        total_price=product.price * item.quantity,
-                    )
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    price=item.product.price,
+                    quantity=item.quantity,
+                    total_price=item.product.price * item.quantity,
                 )
+                for item in cart_items
+            ])
+            SellerOrderIndex.record(order, order_items)
+            SellerSalesRollup.add(order, order_items)
 
-            OrderItem.objects.bulk_create(order_items)
-
-            cart.delete()
+            Cart(pk=cart_id).delete()
 
             return order
 
+    @staticmethod
+    def _restock(order_ids):
+        """Put the items of the given orders back in stock with one UPDATE."""
+        restock = dict(
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .values('product_id')
+            .annotate(total=Sum('quantity'))
+            .order_by()
+            .values_list('product_id', 'total')
+        )
+        StockReservation.release(restock)
+
     @staticmethod
     def cancel_order(order, user):
         with transaction.atomic():
 
-            if not user.is_staff and order.user != user:
+            if not user.is_staff and order.user_id != user.id:
                 raise PermissionDenied(
                     {'detail': 'You can only cancel your own order'}
                 )
 
-            if order.status == Order.DELIVERED:
+            # re-read under a row lock so two concurrent cancels cannot
+            # both pass the status check and refund twice
+            locked = Order.objects.select_for_update().only(
+                'id', 'user_id', 'status', 'total_price'
+            ).get(pk=order.pk)
+
+            if locked.status == Order.DELIVERED:
                 raise ValidationError(
                     {'detail': 'Cannot cancel delivered order'}
                 )
 
-            if order.status == Order.CANCELED:
+            if locked.status == Order.CANCELED:
                 raise ValidationError(
                     {'detail': 'Order already canceled'}
                 )
 
-            order.user.balance += order.total_price
-            order.user.save()
+            User.objects.filter(pk=locked.user_id).update(
+                balance=F('balance') + locked.total_price
+            )
 
-            for item in order.items.select_related('product'):
-                product = item.product
-                product.stock += item.quantity
-                product.save()
+            OrderService._restock([locked.pk])
+            SellerSalesRollup.remove([locked.pk])
 
+            Order.objects.filter(pk=locked.pk).update(status=Order.CANCELED, updated_at=Now())
+            orders_status_changed.send(sender=Order, order_ids=[locked.pk])
             order.status = Order.CANCELED
-            order.save()
 
-            return order
\ No newline at end of file
+            return order
+
+    @staticmethod
+    def cancel_orders(order_ids, batch_size=500):
+        """
+        Cancel many orders (admin action). Each batch is one transaction:
+        lock the orders, one refund UPDATE per batch (Case/When per user),
+        one restock UPDATE and one status UPDATE. Delivered and already
+        canceled orders are skipped. Returns the number canceled.
+        """
+        order_ids = list(order_ids)
+        canceled = 0
+        for start in range(0, len(order_ids), batch_size):
+            with transaction.atomic():
+                orders = list(
+                    Order.objects.select_for_update()
+                    .filter(pk__in=order_ids[start:start + batch_size])
+                    .exclude(status__in=[Order.DELIVERED, Order.CANCELED])
+                    .values_list('id', 'user_id', 'total_price')
+                )
+                if not orders:
+                    continue
+
+                refunds = {}
+                for _, user_id, total_price in orders:
+                    refunds[user_id] = refunds.get(user_id, 0) + total_price
+                User.objects.filter(pk__in=refunds).update(
+                    balance=F('balance') + Case(
+                        *(When(pk=user_id, then=Value(amount)) for user_id, amount in refunds.items()),
+                        output_field=DecimalField(max_digits=12, decimal_places=2),
+                    )
+                )
+
+                ids = [order_id for order_id, _, _ in orders]
+                OrderService._restock(ids)
+                SellerSalesRollup.remove(ids)
+                Order.objects.filter(pk__in=ids).update(status=Order.CANCELED, updated_at=Now())
+                orders_status_changed.send(sender=Order, order_ids=ids)
+                canceled += len(ids)
+        return canceled
+
+
+class OrderStatsService:
+
+    @staticmethod
+    def report(start, end, top=10):
+        """
+        Store-wide order figures for the days `start`..`end`, aggregated in
+        the database: revenue and orders per day, orders per status, the
+        average basket and the best-selling products. Canceled orders only
+        show up in the status counts.
+        """
+        since = timezone.make_aware(datetime.combine(start, time.min))
+        until = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+        orders = Order.objects.filter(created_at__gte=since, created_at__lt=until)
+        placed = orders.exclude(status=Order.CANCELED)
+        items = OrderItem.objects.filter(
+            order__created_at__gte=since, order__created_at__lt=until,
+        ).exclude(order__status=Order.CANCELED)
+
+        per_day = {
+            row['day']: row
+            for row in placed.annotate(day=TruncDate('created_at')).values('day')
+            .annotate(revenue=Sum('total_price'), orders=Count('id')).order_by()
+        }
+        revenue_by_day = []
+        day = start
+        while day <= end:
+            row = per_day.get(day, {})
+            revenue_by_day.append({'date': day, 'revenue': row.get('revenue', 0), 'orders': row.get('orders', 0)})
+            day += timedelta(days=1)
+
+        by_status = {status: 0 for status, _ in Order.STATUS_CHOICES}
+        by_status.update(orders.values_list('status').annotate(count=Count('id')).order_by())
+
+        basket = placed.aggregate(orders=Count('id'), revenue=Sum('total_price'), average_total=Avg('total_price'))
+        lines = items.aggregate(lines=Count('id'), units=Sum('quantity'))
+        count = basket['orders']
+
+        top_products = (
+            items.values('product_id', 'product__name', 'product__sku')
+            .annotate(quantity=Sum('quantity'), revenue=Sum('total_price'))
+            .order_by('-quantity', 'product_id')[:top]
+        )
+        return {
+            'start': start,
+            'end': end,
+            'revenue': basket['revenue'] or 0,
+            'orders': count,
+            'revenue_by_day': revenue_by_day,
+            'orders_by_status': by_status,
+            'average_basket': {
+                'total': round(basket['average_total'], 2) if count else 0,
+                'lines': round(lines['lines'] / count, 2) if count else 0,
+                'units': round(lines['units'] / count, 2) if count else 0,
+            },
+            'top_products': [
+                {'product_id': row['product_id'], 'name': row['product__name'], 'sku': row['product__sku'],
+                 'quantity': row['quantity'], 'revenue': row['revenue']}
+                for row in top_products
+            ],
+        }
+
+
+class CartService:
+
+    @staticmethod
+    def lines(**filters):
+        """
+        Cart lines with their product and cart in one query, each annotated
+        with `line_total` and the cart-wide `cart_total`, `line_count` and
+        `item_count` (window aggregates over the cart).
+        """
+        line_total = ExpressionWrapper(
+            F('quantity') * F('product__price'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+        per_cart = {'partition_by': [F('cart_id')]}
+        return (
+            CartItem.objects.filter(**filters)
+            .select_related('cart', 'product')
+            .annotate(
+                line_total=line_total,
+                cart_total=Window(Sum(line_total), **per_cart),
+                line_count=Window(Count('id'), **per_cart),
+                item_count=Window(Sum('quantity'), **per_cart),
+            )
+            .order_by('id')
+        )
+
+    @staticmethod
+    def _with_lines(cart, lines):
+        cart.lines = lines
+        first = lines[0] if lines else None
+        cart.total = first.cart_total if first else 0
+        cart.line_count = first.line_count if first else 0
+        cart.item_count = first.item_count if first else 0
+        return cart
+
+    @staticmethod
+    def get_cart(user, cart_id):
+        """
+        A cart with its lines and totals: one query when the cart has items,
+        a second only to tell an empty cart from a missing one. Returns None
+        when `user` has no such cart.
+        """
+        lines = list(CartService.lines(cart_id=cart_id, cart__user=user))
+        if lines:
+            return CartService._with_lines(lines[0].cart, lines)
+        cart = Cart.objects.filter(pk=cart_id, user=user).first()
+        return CartService._with_lines(cart, []) if cart else None
+
+    @staticmethod
+    def get_or_create_cart(user):
+        """The user's cart, read the same way; only an empty or new cart costs more queries."""
+        lines = list(CartService.lines(cart__user=user))
+        if lines:
+            return CartService._with_lines(lines[0].cart, lines), False
+        cart, created = Cart.objects.get_or_create(user=user)
+        return CartService._with_lines(cart, []), created
+
+    @staticmethod
+    def apply_operations(cart_id, operations):
+        """
+        Apply a list of add/set/remove operations to a cart with a fixed
+        number of queries: one IN query for the products, one locked read
+        of the touched lines, one upsert on (cart, product) and one delete.
+        Operations on the same product are applied in order; a line that
+        ends at quantity 0 is removed, one above the product's stock fails
+        the whole batch with InsufficientStock.
+        """
+        product_ids = {operation['product_id'] for operation in operations}
+
+        with transaction.atomic():
+            products = {
+                row['id']: row
+                for row in Product.objects.filter(pk__in=product_ids).values('id', 'name', 'price', 'stock')
+            }
+            missing = sorted(product_ids - set(products))
+            if missing:
+                raise ValidationError({
+                    'product_id': [f"Product with id {product_id} does not exist!" for product_id in missing]
+                })
+
+            quantities = dict(
+                CartItem.objects.select_for_update()
+                .filter(cart_id=cart_id, product_id__in=product_ids)
+                .values_list('product_id', 'quantity')
+            )
+            for operation in operations:
+                product_id = operation['product_id']
+                if operation['op'] == 'add':
+                    quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+                elif operation['op'] == 'set':
+                    quantities[product_id] = operation['quantity']
+                else:
+                    quantities[product_id] = 0
+
+            over = [
+                {'product_id': product_id, 'name': products[product_id]['name'],
+                 'requested': quantity, 'available': products[product_id]['stock']}
+                for product_id, quantity in quantities.items() if quantity > products[product_id]['stock']
+            ]
+            if over:
+                raise InsufficientStock(over)
+
+            lines = [
+                CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity, unit_price=products[product_id]['price'])
+                for product_id, quantity in quantities.items() if quantity > 0
+            ]
+            removed = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+            if lines:
+                CartItem.objects.bulk_create(
+                    lines,
+                    update_conflicts=True,
+                    unique_fields=['cart', 'product'],
+                    update_fields=['quantity', 'unit_price'],
+                )
+            if removed:
+                CartItem.objects.filter(cart_id=cart_id, product_id__in=removed).delete()
+
+    @staticmethod
+    def set_quantity(cart_item, quantity):
+        """
+        Set a line's quantity (re-confirming the current price) with one
+        UPDATE that only matches while the product has that much stock.
+        """
+        updated = CartItem.objects.filter(pk=cart_item.pk, product__stock__gte=quantity).update(
+            quantity=quantity, unit_price=cart_item.product.price,
+        )
+        if not updated:
+            product = Product.objects.filter(pk=cart_item.product_id).values('name', 'stock').first() or {}
+            raise InsufficientStock([{
+                'product_id': cart_item.product_id,
+                'name': product.get('name', str(cart_item.product_id)),
+                'requested': quantity,
+                'available': product.get('stock', 0),
+            }])
+        cart_item.quantity = quantity
+        cart_item.unit_price = cart_item.product.price
+        return cart_item
+
+    @staticmethod
+    def add_item(cart_id, product_id, quantity):
+        """
+        Add `quantity` of a product to a cart in one atomic statement:
+        `INSERT ... ON CONFLICT (cart, product) DO UPDATE SET quantity =
+        quantity + excluded.quantity`, guarded by the product's stock on
+        both the insert and the update, so concurrent adds from several
+        devices neither lose increments nor collide on the unique key.
+        Raises InsufficientStock when the line would exceed the stock.
+        """
+        quote = connection.ops.quote_name
+        cart_item = quote(CartItem._meta.db_table)
+        product = quote(Product._meta.db_table)
+        cart_pk = Cart._meta.pk
+        with connection.cursor() as cursor:
+            # `WHERE TRUE` keeps SQLite from reading ON CONFLICT as a join clause
+            cursor.execute(
+                f"""
+                INSERT INTO {cart_item} (cart_id, product_id, quantity, unit_price)
+                SELECT %s, p.id, %s, p.price FROM {product} p
+                WHERE TRUE AND p.id = %s AND p.stock >= %s
+                ON CONFLICT (cart_id, product_id) DO UPDATE
+                SET quantity = {cart_item}.quantity + excluded.quantity,
+                    unit_price = excluded.unit_price
+                WHERE {cart_item}.quantity + excluded.quantity
+                    <= (SELECT stock FROM {product} WHERE id = excluded.product_id)
+                RETURNING id, quantity, unit_price
+                """,
+                [
+                    cart_pk.get_db_prep_value(cart_pk.to_python(cart_id), connection),
+                    quantity, product_id, quantity,
+                ],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            # nothing written: tell a missing product from a stock cap
+            found = Product.objects.filter(pk=product_id).values('name', 'stock').first()
+            if found is None:
+                raise ValidationError({'product_id': [f"Product with id {product_id} does not exist!"]})
+            in_cart = (
+                CartItem.objects.filter(cart_id=cart_id, product_id=product_id)
+                .values_list('quantity', flat=True).first() or 0
+            )
+            raise InsufficientStock([{
+                'product_id': product_id,
+                'name': found['name'],
+                'requested': in_cart + quantity,
+                'available': found['stock'],
+            }])
+
+        item_id, total, unit_price = row
+        return CartItem(
+            id=item_id, cart_id=cart_id, product_id=product_id, quantity=total,
+            unit_price=CartItem._meta.get_field('unit_price').to_python(unit_price),
+        )
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from order.models import Order
+from order.projections import SellerOrderIndex
+
+
+# Sent after order status writes that bypass model signals (update()).
+# kwargs: order_ids
+orders_status_changed = Signal()
+
+
+@receiver(post_save, sender=Order)
+def sync_order(sender, instance, created, **kwargs):
+    # new orders are recorded by OrderService.create_order, with their items
+    if not created:
+        SellerOrderIndex.sync_status([instance.pk])
+
+
+@receiver(orders_status_changed)
+def sync_orders(sender, order_ids, **kwargs):
+    SellerOrderIndex.sync_status(order_ids)
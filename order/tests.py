@@ -1,3 +1,141 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import skipIf
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from order.models import Cart, CartItem, Order, SellerDailySales, SellerOrderLine
+from order.reservations import InsufficientStock
+from order.services import CartService, OrderService
+from product.models import Category, Product
+from users.models import User
+
+
+class CreateOrderQueryCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Groceries')
+        cls.products = [
+            Product.objects.create(
+                name=f'Product {number}', description='test', price=Decimal('10.00'),
+                stock=100, category=cls.category,
+            )
+            for number in range(20)
+        ]
+
+    def place_order(self, lines):
+        user = User.objects.create_user(email=f'buyer-{lines}@example.com', password=None, balance=Decimal('10000'))
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=2) for product in self.products[:lines]
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            order = OrderService.create_order(user_id=user.id, cart_id=cart.id)
+        self.assertEqual(order.items.count(), lines)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        self.assertEqual(self.place_order(1), self.place_order(20))
+
+    def test_cart_of_another_user_is_rejected(self):
+        owner = User.objects.create_user(email='owner@example.com', password=None, balance=Decimal('100'))
+        other = User.objects.create_user(email='other@example.com', password=None, balance=Decimal('100'))
+        cart = Cart.objects.create(user=owner)
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=1)
+
+        with self.assertRaises(ValidationError):
+            OrderService.create_order(user_id=other.id, cart_id=cart.id)
+        self.assertFalse(Order.objects.exists())
+        self.assertTrue(CartItem.objects.filter(cart=cart).exists())
+
+
+
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Groceries')
+        cls.product = Product.objects.create(
+            name='Rice', description='test', price=Decimal('10.00'), stock=5, category=category,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def listed_stock(self, response):
+        return {row['id']: row['stock'] for row in response.data['results']}[self.product.id]
+
+    def checkout(self, quantity):
+        user = User.objects.create_user(email='buyer@example.com', password=None, balance=Decimal('100'))
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=quantity)
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.create_order(user_id=user.id, cart_id=cart.id)
+
+    def test_checkout_invalidates_cached_product_list(self):
+        self.assertEqual(self.listed_stock(self.client.get('/api/v1/products/')), 5)
+        self.checkout(2)
+
+        response = self.client.get('/api/v1/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.listed_stock(response), 3)
+
+
+class AdminStatusUpdateTests(TestCase):
+
+    def test_cancel_through_update_status_reverses_seller_rollup(self):
+        seller = User.objects.create_user(email='seller@example.com', password=None, role=User.SELLER)
+        admin = User.objects.create_user(email='admin@example.com', password=None, is_staff=True)
+        buyer = User.objects.create_user(email='buyer@example.com', password=None, balance=Decimal('100'))
+        product = Product.objects.create(
+            name='Rice', description='test', price=Decimal('10.00'), stock=5,
+            category=Category.objects.create(name='Groceries'), seller=seller,
+        )
+        cart = Cart.objects.create(user=buyer)
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+        order = OrderService.create_order(user_id=buyer.id, cart_id=cart.id)
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.patch(f'/api/v1/orders/{order.pk}/update_status/', {'status': Order.CANCELED}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SellerOrderLine.objects.get(order=order).status, Order.CANCELED)
+        rollup = SellerDailySales.objects.get(seller=seller, product=product)
+        self.assertEqual((rollup.order_count, rollup.quantity, rollup.revenue), (0, 0, 0))
+        buyer.refresh_from_db()
+        product.refresh_from_db()
+        self.assertEqual((buyer.balance, product.stock), (Decimal('100'), 5))
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite serializes writers, run against PostgreSQL')
+class ConcurrentCartAddTests(TransactionTestCase):
+
+    def add(self, cart_id, product_id):
+        try:
+            CartService.add_item(cart_id, product_id, 1)
+            return 'ok'
+        except InsufficientStock:
+            return 'stock_cap'
+        finally:
+            connections.close_all()
+
+    def test_concurrent_adds_lose_nothing_and_respect_stock(self):
+        category = Category.objects.create(name='Groceries')
+        product = Product.objects.create(
+            name='Hot SKU', description='test', price=Decimal('10.00'), stock=150, category=category,
+        )
+        cart = Cart.objects.create(user=User.objects.create_user(email='buyer@example.com', password=None))
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            outcomes = list(pool.map(lambda _: self.add(cart.id, product.id), range(200)))
+
+        line = CartItem.objects.get(cart=cart, product=product)
+        self.assertEqual(outcomes.count('ok'), 150)
+        self.assertEqual(outcomes.count('stock_cap'), 50)
+        self.assertEqual(line.quantity, outcomes.count('ok'))
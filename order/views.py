@@ -1,6 +1,7 @@
 import json
-import requests
+import uuid
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Prefetch
 from django.shortcuts import render
@@ -8,6 +9,7 @@ from django.shortcuts import render
 
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.mixins import CreateModelMixin, RetrieveModelMixin, DestroyModelMixin
 from rest_framework.permissions import IsAuthenticated,IsAdminUser,AllowAny
 from rest_framework.response import Response
@@ -17,12 +19,25 @@ from rest_framework import status
 
 from .serializers import SSLCommerzPaymentSerializer
 
-from order.models import Cart,CartItem,Order,OrderItem, Wishlist
-from order.serializers import CartSerializer,CartItemSerializer, AddCartItemSerializer, UpdateCartItemSerializer, OrderSerializer, CreateOrderSerializer, UpdateOrderSerializer, EmptySerializer, WishlistSerializer, SellerOrderSerializer
-from order.services import OrderService
+from order.models import Cart,CartItem,Order,OrderItem, SellerOrderLine, Wishlist
+from order.serializers import CartSerializer,CartItemSerializer, AddCartItemSerializer, CartItemBatchSerializer, UpdateCartItemSerializer, OrderSerializer, CreateOrderSerializer, UpdateOrderSerializer, EmptySerializer, WishlistSerializer, SellerOrderSerializer, SellerAnalyticsQuerySerializer, OrderStatsQuerySerializer
+from order.projections import SellerOrderIndex, SellerSalesRollup
+from api.permissions import IsAdmin
+from product.paginations import DefaultPagination
+from order.services import CartService, OrderService, OrderStatsService
+from order.idempotency import idempotent
+from order import gateway, notifications, payments
 
 
 # Create your views here.
+def cart_id_or_404(value):
+    """Cart ids are UUIDs; anything else cannot name a cart."""
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise NotFound()
+
+
 class CartViewSet(CreateModelMixin,RetrieveModelMixin,DestroyModelMixin,GenericViewSet):
     """
     API endpoint for managing cart in the grocery store
@@ -40,7 +55,7 @@ class CartViewSet(CreateModelMixin,RetrieveModelMixin,DestroyModelMixin,GenericV
     #     print("cartviewset perform create called")
     #     serializer.save(user=self.request.user)
     def create(self, request, *args, **kwargs):
-        cart, created = Cart.objects.get_or_create(user=request.user)
+        cart, created = CartService.get_or_create_cart(request.user)
 
         serializer = self.get_serializer(cart)
         return Response(
@@ -48,6 +63,13 @@ class CartViewSet(CreateModelMixin,RetrieveModelMixin,DestroyModelMixin,GenericV
             status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        # lines, totals and staleness flags come from one annotated query
+        cart = CartService.get_cart(request.user, cart_id_or_404(kwargs['pk']))
+        if cart is None:
+            raise NotFound()
+        return Response(self.get_serializer(cart).data)
+
 
 
 class CartItemViewSet(ModelViewSet):
@@ -55,6 +77,7 @@ class CartItemViewSet(ModelViewSet):
     API endpoint for managing cart items
      - Allows authenticated user to view their cart items in their cart
      - Allows authenticated user to create , update, delete cartitems from their cart
+     - Allows authenticated user to add, set and remove many items in one request (batch)
     """
     # queryset = CartItem.objects.all()
     # serializer_class = CartItemSerializer 
@@ -66,6 +89,8 @@ class CartItemViewSet(ModelViewSet):
         return {'cart_id': self.kwargs['cart_pk']}
 
     def get_serializer_class(self):
+        if self.action == 'batch':
+            return CartItemBatchSerializer
         if self.request.method == 'POST':
             return AddCartItemSerializer
         elif self.request.method == 'PATCH':
@@ -81,6 +106,16 @@ class CartItemViewSet(ModelViewSet):
         # print("request.data:", request.data)
         # print("request.user:", request.user)
         return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def batch(self, request, cart_pk=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart_id = cart_id_or_404(cart_pk)
+        if not Cart.objects.filter(pk=cart_id, user=request.user).exists():
+            raise NotFound()
+        CartService.apply_operations(cart_id, serializer.validated_data['operations'])
+        return Response(CartSerializer(CartService.get_cart(request.user, cart_id)).data)
         
 class OrderViewSet(ModelViewSet):
     """
@@ -89,6 +124,10 @@ class OrderViewSet(ModelViewSet):
      - Allows authenticated user to view their purchase history
     """
     http_method_names = ['get','post','patch','delete','head','options']
+
+    @idempotent('orders.create')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
     
     @action(detail=True, methods=['post'])
     def cancel(self,request, pk=None):
@@ -99,10 +138,10 @@ class OrderViewSet(ModelViewSet):
     @action(detail=True,methods=['patch'])
     def update_status(self,request,pk=None):
         order = self.get_object()
-        serializer = UpdateOrderSerializer(order,data = request.data,partial=True)
+        serializer = UpdateOrderSerializer(order,data = request.data,partial=True, context={'user': request.user})
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response({'status': f"status updated successfully to {request.data['status']}"})
+        return Response({'status': f"status updated successfully to {serializer.instance.status}"})
     
     @action(detail=False, methods=['get'], url_path='my-purchase-history')
     def purchase_history(self, request):
@@ -171,26 +210,93 @@ class SellerOrderViewSet(viewsets.ReadOnlyModelViewSet):
     Dashboard for sellers:
     - List orders that include products created by the logged-in seller
     - Read-only: cannot edit orders
+    - Paginated, newest first, optional ?status= filter
+    - The list carries the seller's totals (orders, units, revenue)
     """
     serializer_class = SellerOrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DefaultPagination
+    # detail routes stay keyed by the order id
+    lookup_field = 'order_id'
+    lookup_url_kwarg = 'pk'
 
-    def get_queryset(self):
+    def seller_lines(self):
         user = self.request.user
-        if user.role != 'seller' and not user.is_staff:
-            return Order.objects.none()  
+        if getattr(self, 'swagger_fake_view', False) or (user.role != 'seller' and not user.is_staff):
+            return SellerOrderLine.objects.none()
 
-        seller_items = OrderItem.objects.filter(product__seller=user)
-        return Order.objects.prefetch_related(
-            Prefetch('items', queryset=seller_items, to_attr='seller_items')
-        ).filter(items__product__seller=user).distinct()
-    
+        lines = SellerOrderLine.objects.filter(seller=user)
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            lines = lines.filter(status=status_filter)
+        return lines
+
+    def get_queryset(self):
+        return self.seller_lines().select_related('order').prefetch_related(
+            Prefetch('order__items', queryset=SellerOrderIndex.items(self.request.user), to_attr='seller_items')
+        ).order_by('-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response.data['totals'] = SellerOrderIndex.totals(self.seller_lines())
+        return response
+
+
+class SellerAnalyticsView(APIView):
+    """
+    Sales analytics for sellers, answered from the daily rollups:
+    - Revenue, units and orders per day or week, with totals
+    - Top products by revenue
+    - ?start=&end= (default: the last 30 days), ?interval=day|week, ?top=N
+    - Admins can pass ?seller=<user id>
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = SellerAnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        user = request.user
+        if IsAdmin().has_permission(request, self):
+            seller = params.get('seller', user.pk)
+        elif user.role == 'seller':
+            seller = user.pk
+        else:
+            return Response({'detail': 'Only sellers can view sales analytics.'}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response(SellerSalesRollup.report(
+            seller, params['start'], params['end'], interval=params['interval'], top=params['top'],
+        ))
 
 
+class OrderStatsView(APIView):
+    """
+    Order analytics for admins (admin role or staff), aggregated in the database:
+    - Revenue and orders per day, orders per status
+    - Average basket (total, lines, units) and top products
+    - ?start=&end= (default: the last 30 days), ?top=N
+    - Cached for ORDER_STATS_CACHE_TIMEOUT seconds
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        serializer = OrderStatsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        key = f'order-stats:{params["start"]}:{params["end"]}:{params["top"]}'
+        report = cache.get(key)
+        if report is None:
+            report = OrderStatsService.report(params['start'], params['end'], top=params['top'])
+            cache.set(key, report, settings.ORDER_STATS_CACHE_TIMEOUT)
+        return Response(report)
+
 
 class SSLCommerzPaymentView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent('payments.session')
     def post(self, request):
         serializer = SSLCommerzPaymentSerializer(
             data=request.data,
@@ -201,39 +307,17 @@ class SSLCommerzPaymentView(APIView):
         order_id = serializer.validated_data['order_id']
         order = Order.objects.get(id=order_id)  # safe because validated
 
-        total_amount = order.total_price
-
-        # SSLCommerz config
-        store_id = settings.SSLCOMMERZ_STORE_ID
-        store_pass = settings.SSLCOMMERZ_STORE_PASSWORD
-        is_live = False  # False for sandbox
-
-        payload = {
-            "store_id": store_id,
-            "store_passwd": store_pass,
-            "total_amount": str(total_amount),
-            "currency": "BDT",
-            "tran_id": str(order.id),
-            "success_url": settings.SSLCOMMERZ_SUCCESS_URL,
-            "fail_url": settings.SSLCOMMERZ_FAIL_URL,
-            "cancel_url": settings.SSLCOMMERZ_CANCEL_URL,
-            "cus_name": request.user.get_full_name(),
-            "cus_email": request.user.email,
-            "cus_add1": "N/A",
-            "cus_city": "N/A",
-            "cus_country": "Bangladesh",
-            "shipping_method": "NO",
-            "product_name": "Cart Order",
-            "product_category": "General",
-            "product_profile": "general",
-        }
-
-        api_url = "https://sandbox.sslcommerz.com/gwprocess/v4/api.php" if not is_live else "https://securepay.sslcommerz.com/gwprocess/v4/api.php"
-
-        response = requests.post(api_url, data=payload)
-        data = response.json()
+        payload = gateway.session_payload(order, request.user)
+
+        try:
+            data = gateway.get_client().create_session(payload)
+        except gateway.CircuitOpen:
+            return Response({"error": "Payment gateway unavailable, try again shortly"}, status=503)
+        except gateway.GatewayError:
+            return Response({"error": "Failed to create SSLCommerz session"}, status=502)
 
         if data.get("status") == "SUCCESS":
+            payments.session_payment(order, data).save()
             return Response({"payment_url": data.get("GatewayPageURL")})
         return Response({"error": "Failed to create SSLCommerz session"}, status=400)
 
@@ -242,6 +326,10 @@ class SSLCommerzIPNView(APIView):
     """
     IPN (Instant Payment Notification) handler for SSLCommerz.
     Called asynchronously by SSLCommerz servers after a payment attempt.
+     - Unknown or already processed orders get 404
+     - The notification is stored and acknowledged right away (202)
+     - `python manage.py process_payment_notifications` validates queued
+       notifications with the gateway and marks the orders Ready To Ship
     """
     permission_classes = [AllowAny]
 
@@ -250,55 +338,21 @@ class SSLCommerzIPNView(APIView):
 
         tran_id = data.get("tran_id")
         val_id = data.get("val_id")
-        # status = data.get("status")   # you can log this if you want, but not required for validation
 
         if not tran_id or not val_id:
             return Response({"error": "Missing tran_id or val_id"}, status=400)
+        if len(str(tran_id)) > 64 or len(str(val_id)) > 255:
+            return Response({"error": "Invalid tran_id or val_id"}, status=400)
 
-        try:
-            order = Order.objects.get(id=tran_id, status=Order.NOT_PAID)
-        except Order.DoesNotExist:
+        # only orders awaiting payment are queued, so the worker never calls
+        # the gateway for made-up transactions
+        if not notifications.is_payable(tran_id):
             return Response({"error": "Order not found or already processed"}, status=404)
 
-        # Step 1: Verify the transaction with SSLCommerz (this is what makes it secure)
-        verify_url = "https://sandbox.sslcommerz.com/validator/api/validationserverAPI.php"
-        if getattr(settings, "SSLCOMMERZ_LIVE", False):
-            verify_url = "https://securepay.sslcommerz.com/validator/api/validationserverAPI.php"
-
-        params = {
-            "val_id": val_id,
-            "store_id": settings.SSLCOMMERZ_STORE_ID,
-            "store_passwd": settings.SSLCOMMERZ_STORE_PASSWORD,
-            "v": "1",
-            "format": "json",
-        }
-
-        try:
-            verification_response = requests.get(verify_url, params=params, timeout=10)
-            verification_response.raise_for_status()
-            verification = verification_response.json()
-        except (requests.RequestException, ValueError):
-            # Log this in production (e.g. sentry / logging)
-            return Response({"error": "Failed to verify payment with SSLCommerz"}, status=502)
-
-        if verification.get("status") != "VALID":
-            # Optional: you could update order.status = "Payment Failed" here
-            return Response({
-                "success": False,
-                "message": f"Payment verification failed: {verification.get('status')}"
-            }, status=400)
-
-        # Step 2: Payment is VALID → update order (atomic)
-        with transaction.atomic():
-            order.status = "Ready To Ship"  # ← good choice, or "Paid", "Processing", etc.
-            order.save(update_fields=["status"])
-
-            # Optional future improvements:
-            # - Send confirmation email to customer
-            # - Create a Payment model instance to record val_id, amount, etc.
+        notifications.enqueue(tran_id, val_id, data)
 
         return Response({
             "success": True,
-            "order_id": str(order.id),
-            "message": "Order payment confirmed"
-        }, status=200)
\ No newline at end of file
+            "order_id": tran_id,
+            "message": "Payment notification received"
+        }, status=202)
@@ -0,0 +1,224 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+KEY_PREFIX = 'catalog'
+
+# Version scopes. A list scope moves on any change to its collection,
+# an object scope (`product:<id>`) only when that object changes.
+PRODUCTS = 'products'
+PRODUCT = 'product'
+CATEGORIES = 'categories'
+CATEGORY = 'category'
+
+
+def _version_key(scope, pk=None):
+    return f'{KEY_PREFIX}:v:{scope}' if pk is None else f'{KEY_PREFIX}:v:{scope}:{pk}'
+
+
+def get_version(scope, pk=None):
+    key = _version_key(scope, pk)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never falls back to a
+        # value that older entries were stored under.
+        version = int(time.time() * 1000)
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump(scope, pk=None):
+    key = _version_key(scope, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def bump_on_commit(*scopes):
+    """
+    Bump `(scope, pk)` pairs once the current transaction commits, so a
+    reader can never cache pre-commit data under the new version.
+    """
+    def _bump():
+        for scope, pk in scopes:
+            bump(scope, pk)
+    transaction.on_commit(_bump)
+
+
+def bump_products(product_ids):
+    """Invalidate the product list and the given product details."""
+    bump_on_commit((PRODUCTS, None), *((PRODUCT, pk) for pk in product_ids))
+
+
+def _count(name):
+    key = f'{KEY_PREFIX}:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_stats():
+    hits = cache.get(f'{KEY_PREFIX}:stats:hit', 0)
+    misses = cache.get(f'{KEY_PREFIX}:stats:miss', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([f'{KEY_PREFIX}:stats:hit', f'{KEY_PREFIX}:stats:miss'])
+
+
+def response_key(request, versions):
+    """Cache key from host, path, sorted query string and the current versions."""
+    params = sorted((key, values) for key, values in request.query_params.lists())
+    query = '&'.join(f'{key}={",".join(values)}' for key, values in params)
+    stamp = '|'.join(str(get_version(scope, pk)) for scope, pk in versions)
+    raw = f'{request.get_host()}{request.path}?{query}#{stamp}'
+    return f'{KEY_PREFIX}:entry:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for `list`/`retrieve` responses.
+     - Key: normalized query string + version counters of the scopes involved
+     - Writes bump the versions (see product.signals), so entries are never
+       served stale; they simply stop being addressed and expire
+     - An entry keeps the validators the body was rendered under, so
+       ConditionalGetMixin answers with the ETag of the body actually sent
+     - Adds `X-Cache: HIT|MISS` and counts hits/misses
+    """
+    cache_list_scopes = ()
+    cache_detail_scopes = ()
+    cache_object_scope = None
+    # (tag, last_modified) of the current request, set by ConditionalGetMixin
+    response_validators = None
+
+    def get_cache_versions(self):
+        if self.action != 'retrieve':
+            return [(scope, None) for scope in self.cache_list_scopes]
+        versions = [(scope, None) for scope in self.cache_detail_scopes]
+        if self.cache_object_scope:
+            versions.append((self.cache_object_scope, self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)))
+        return versions
+
+    def get_cached_entry(self, request):
+        """`{'data', 'tag', 'last_modified'}` for this request, or None; read once per request."""
+        if not hasattr(self, '_cache_key'):
+            self._cache_key = response_key(request, self.get_cache_versions())
+            self._cache_entry = cache.get(self._cache_key)
+        return self._cache_entry
+
+    def cached_response(self, request, render):
+        if request.method != 'GET':
+            return render()
+
+        entry = self.get_cached_entry(request)
+        if entry is not None:
+            _count('hit')
+            response = Response(entry['data'])
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _count('miss')
+        response = render()
+        if response.status_code == 200:
+            tag, last_modified = self.response_validators or (None, None)
+            cache.set(
+                self._cache_key,
+                {'data': response.data, 'tag': tag, 'last_modified': last_modified},
+                getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300),
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag / Last-Modified for `list`/`retrieve`.
+     - Validators come from one aggregate over the filtered queryset
+       (count, max pk, max `last_modified_field`) plus the version counters
+     - On views with CachedResponseMixin a cached entry's own validators win,
+       so a 304 never vouches for a body other than the one being cached
+     - A matching `If-None-Match` returns 304 before anything is serialized
+    """
+    last_modified_field = 'updated_at'
+
+    def get_etag_versions(self):
+        if hasattr(self, 'get_cache_versions'):
+            return self.get_cache_versions()
+        return []
+
+    def get_conditional_validators(self, request):
+        """(tag, last_modified) of the body; the tag is independent of the media type."""
+        entry = self.get_cached_entry(request) if hasattr(self, 'get_cached_entry') else None
+        if entry is not None and entry['tag']:
+            return entry['tag'], entry['last_modified']
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        aggregates = {'count': Count('pk'), 'top': Max('pk')}
+        if self.last_modified_field:
+            aggregates['last'] = Max(self.last_modified_field)
+        stats = queryset.order_by().aggregate(**aggregates)
+        if self.action == 'retrieve' and not stats['count']:
+            return None
+
+        last_modified = stats.get('last')
+        versions = '|'.join(str(get_version(scope, pk)) for scope, pk in self.get_etag_versions())
+        params = sorted((key, values) for key, values in request.query_params.lists())
+        raw = (
+            f'{request.path}?{params}#{stats["count"]}:{stats["top"]}:'
+            f'{last_modified.isoformat() if last_modified else ""}:{versions}'
+        )
+        return hashlib.md5(raw.encode()).hexdigest(), last_modified
+
+    def conditional_response(self, request, render):
+        if request.method not in ('GET', 'HEAD'):
+            return render()
+        validators = self.get_conditional_validators(request)
+        if validators is None:
+            return render()
+
+        tag, last_modified = validators
+        self.response_validators = validators
+        etag = quote_etag(hashlib.md5(f'{tag}:{request.accepted_media_type}'.encode()).hexdigest())
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
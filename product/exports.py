@@ -0,0 +1,62 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+COLUMNS = [
+    'id', 'sku', 'name', 'description', 'price', 'stock', 'category_id', 'category_name',
+    'seller_id', 'avg_rating', 'rating_count', 'updated_at',
+]
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Flat dicts straight from the database, fetched `chunk_size` rows at a time."""
+    return (
+        queryset.values(
+            'id', 'sku', 'name', 'description', 'price', 'stock', 'category_id',
+            'seller_id', 'avg_rating', 'rating_count', 'updated_at',
+            category_name=F('category__name'),
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back."""
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, batch=500):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([row[column] for column in COLUMNS]))
+        if len(buffer) >= batch:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_ndjson(rows, batch=500):
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps({column: row[column] for column in COLUMNS}, cls=DjangoJSONEncoder) + '\n')
+        if len(buffer) >= batch:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_export(queryset, fmt, chunk_size=2000):
+    rows = export_rows(queryset, chunk_size=chunk_size)
+    return iter_csv(rows) if fmt == 'csv' else iter_ndjson(rows)
@@ -1,6 +1,9 @@
 import django_filters
 from django_filters.rest_framework import FilterSet
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
 from product.models import Product
+from product.search import get_search_backend
 
 
 class ProductFilter(FilterSet):
@@ -15,6 +18,25 @@ class ProductFilter(FilterSet):
     price__gt = django_filters.NumberFilter(field_name="price", lookup_expr="gt")
     price__lt = django_filters.NumberFilter(field_name="price", lookup_expr="lt")
 
+    # average rating, read from the denormalized column
+    rating__gte = django_filters.NumberFilter(field_name="avg_rating", lookup_expr="gte")
+
     class Meta:
         model = Product
-        fields = ['category_id', 'price__gt', 'price__lt']
\ No newline at end of file
+        fields = ['category_id', 'price__gt', 'price__lt', 'rating__gte']
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    `?search=` through the configured full-text backend (see product.search).
+    Results are ranked by relevance unless `?ordering=` is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        queryset = get_search_backend().search(queryset, query)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset
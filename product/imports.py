@@ -0,0 +1,159 @@
+import codecs
+import csv
+import json
+
+from django.db import transaction
+from rest_framework import serializers
+
+from product.models import Category, Product
+from product.serializers import ProductSerializer
+from product.signals import products_bulk_changed
+
+
+FORMATS = ('csv', 'jsonl')
+UPSERT_FIELDS = ['name', 'description', 'price', 'stock', 'category', 'updated_at']
+
+
+def detect_format(name='', content_type=''):
+    """Guess `csv` / `jsonl` from a file name or content type."""
+    name, content_type = (name or '').lower(), (content_type or '').lower()
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return None
+
+
+def iter_rows(stream, fmt):
+    """
+    Lazily yield `(row_number, data, error)` from a binary stream, one line
+    at a time, so the whole file is never held in memory.
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, {key: value for key, value in row.items() if key}, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield number, None, {'non_field_errors': ['Invalid JSON.']}
+            continue
+        if not isinstance(data, dict):
+            yield number, None, {'non_field_errors': ['Expected a JSON object.']}
+            continue
+        yield number, data, None
+
+
+class ProductImportSerializer(ProductSerializer):
+    """
+    ProductSerializer rules for one import row. `sku` is required (it is the
+    upsert key) and `category` is a bare id, checked per chunk in one query.
+    """
+    sku = serializers.CharField(max_length=64)
+    category = serializers.IntegerField(min_value=1)
+    images = None
+    seller = None
+    reviews = None
+    rating_histogram = None
+    price_with_tax = None
+
+    class Meta:
+        model = Product
+        fields = ['sku', 'name', 'description', 'price', 'stock', 'category']
+        validators = []
+
+
+class ProductImporter:
+    """
+    Validate rows in chunks and upsert each chunk with one
+    `INSERT ... ON CONFLICT (seller_id, sku) DO UPDATE`.
+    """
+
+    def __init__(self, seller, chunk_size=1000, max_errors=1000):
+        self.seller = seller
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.report = {'processed': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+
+    def run(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._process(chunk)
+                chunk = []
+        if chunk:
+            self._process(chunk)
+        return self.report
+
+    def _error(self, number, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < self.max_errors:
+            self.report['errors'].append({'row': number, 'errors': errors})
+        else:
+            self.report['errors_truncated'] = True
+
+    def _process(self, chunk):
+        # one serializer for the whole chunk, so its fields are built once
+        serializer = ProductImportSerializer()
+        valid = {}
+        for number, data, error in chunk:
+            if error:
+                self._error(number, error)
+                continue
+            try:
+                validated = serializer.run_validation(data)
+            except serializers.ValidationError as exc:
+                self._error(number, exc.detail)
+                continue
+            # a repeated SKU inside one chunk: the last row wins
+            valid[validated['sku']] = (number, validated)
+
+        category_ids = {data['category'] for _, data in valid.values()}
+        known = set(Category.objects.filter(pk__in=category_ids).values_list('id', flat=True))
+        products = []
+        for sku, (number, data) in list(valid.items()):
+            if data['category'] not in known:
+                self._error(number, {'category': [f'Invalid pk "{data["category"]}" - object does not exist.']})
+                del valid[sku]
+                continue
+            products.append(Product(
+                seller=self.seller,
+                sku=sku,
+                name=data['name'],
+                description=data['description'],
+                price=data['price'],
+                stock=data['stock'],
+                category_id=data['category'],
+            ))
+        if not products:
+            return
+
+        with transaction.atomic():
+            existing = dict(
+                Product.objects.filter(seller=self.seller, sku__in=valid)
+                .values_list('sku', 'category_id')
+            )
+            Product.objects.bulk_create(
+                products,
+                update_conflicts=True,
+                unique_fields=['seller', 'sku'],
+                update_fields=UPSERT_FIELDS,
+            )
+            product_ids = list(
+                Product.objects.filter(seller=self.seller, sku__in=valid).values_list('id', flat=True)
+            )
+            products_bulk_changed.send(
+                sender=Product,
+                product_ids=product_ids,
+                category_ids=set(existing.values()) | {product.category_id for product in products},
+            )
+
+        self.report['processed'] += len(products)
+        self.report['updated'] += len(existing)
+        self.report['created'] += len(products) - len(existing)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from product.cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the catalog response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing')
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit ratio: {stats['hit_ratio']:.2%}"
+        )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product import exports
+from product.filters import ProductFilter
+from product.models import Product
+from product.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Stream the product catalog to CSV or NDJSON with flat memory use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='csv', dest='file_format')
+        parser.add_argument('--output', help='File path, defaults to stdout')
+        parser.add_argument('--category-id', help='Comma separated category ids')
+        parser.add_argument('--price-gt')
+        parser.add_argument('--price-lt')
+        parser.add_argument('--search')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        data = {
+            'category_id': options['category_id'],
+            'price__gt': options['price_gt'],
+            'price__lt': options['price_lt'],
+        }
+        filterset = ProductFilter(
+            data={key: value for key, value in data.items() if value is not None},
+            queryset=Product.objects.all(),
+        )
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+        queryset = filterset.qs
+        if options['search']:
+            queryset = get_search_backend().search(queryset, options['search'])
+
+        chunks = exports.iter_export(queryset, options['file_format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f'Exported to {options["output"]}.'))
+        else:
+            sys.stdout.writelines(chunks)
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.imports import FORMATS, ProductImporter, detect_format, iter_rows
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Bulk create/update a seller\'s products from a CSV or JSON Lines file (upsert on sku)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--seller', required=True, help='Email of the owning seller')
+        parser.add_argument('--format', choices=FORMATS, dest='file_format',
+                            help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            seller = User.objects.get(email=options['seller'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user with email {options["seller"]}.')
+
+        fmt = options['file_format'] or detect_format(options['path'])
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name, pass --format.')
+
+        importer = ProductImporter(seller=seller, chunk_size=options['chunk_size'])
+        with open(options['path'], 'rb') as stream:
+            report = importer.run(iter_rows(stream, fmt))
+
+        self.stdout.write(json.dumps(report, indent=2, default=str))
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["created"]} created, {report["updated"]} updated, {report["failed"]} failed.'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from product.services import ProductRatingService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized rating aggregates on Product from Review rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='products',
+                            help='Only rebuild this product id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = ProductRatingService.rebuild(
+            product_ids=options['products'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings for {updated} product(s).'))
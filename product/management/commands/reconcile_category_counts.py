@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from product.services import CategoryCountService
+
+
+class Command(BaseCommand):
+    help = 'Recount Category.product_count and in_stock_count from the product table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, action='append', dest='categories',
+                            help='Only reconcile this category id (repeatable)')
+
+    def handle(self, *args, **options):
+        updated = CategoryCountService.refresh(options['categories'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {updated} categor(y/ies).'))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:22
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # the GIN index itself is declared on Product.Meta (0010)
+        schema_editor.execute(
+            "UPDATE product_product p SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(p.name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(p.description, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(c.name, '')), 'C') "
+            "FROM product_category c WHERE c.id = p.category_id"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS product_search '
+            "USING fts5(name, description, category, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO product_search (rowid, name, description, category) '
+            'SELECT p.id, p.name, p.description, c.name '
+            'FROM product_product p JOIN product_category c ON c.id = p.category_id'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS product_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
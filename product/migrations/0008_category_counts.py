@@ -0,0 +1,40 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_category_counts(apps, schema_editor):
+    Category = apps.get_model('product', 'Category')
+    Product = apps.get_model('product', 'Product')
+
+    def counted(**filters):
+        counts = (
+            Product.objects.filter(category=OuterRef('pk'), **filters)
+            .order_by().values('category').annotate(total=Count('id')).values('total')
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    Category.objects.update(product_count=counted(), in_stock_count=counted(stock__gt=0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0007_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='in_stock_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_category_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-18 13:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class PostgresAddIndex(migrations.AddIndex):
+    """AddIndex that only touches PostgreSQL; SQLite searches through its FTS5 table instead."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0009_product_sku'),
+    ]
+
+    operations = [
+        PostgresAddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+    ]
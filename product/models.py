@@ -1,18 +1,47 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator,MaxValueValidator, FileExtensionValidator
 from product.validators import validate_file_size
 from cloudinary.models import CloudinaryField
 # Create your models here.
+RATING_FIELDS = (
+    'rating_sum', 'rating_count', 'avg_rating',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+)
+
+
+def fields_except(instance, excluded):
+    """Concrete non-pk field names of `instance`, minus counter-style `excluded` ones."""
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in excluded
+    ]
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True,null = True)
+    # Materialized counts, maintained by CategoryCountService
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    in_stock_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ('product_count', 'in_stock_count')
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # counters only move through F() updates, never from a stale instance
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = fields_except(self, self.COUNTER_FIELDS)
+        super().save(*args, **kwargs)
     
 class Product(models.Model):
     name = models.CharField(max_length=200)
+    # seller's own stock-keeping code, the upsert key for bulk imports
+    sku = models.CharField(max_length=64, null=True, blank=True)
     description = models.TextField()
     price = models.DecimalField(max_digits=10,decimal_places=2)
     stock = models.PositiveIntegerField()
@@ -28,11 +57,54 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized review aggregates, maintained by ProductRatingService
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    avg_rating = models.FloatField(default=0, db_index=True, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Full-text document for PostgresSearchBackend (GIN indexed), see product.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ['-id',]
+        indexes = [
+            # ProductFilter: category__id IN (...) with price range / price ordering
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            # seller dashboard, newest first
+            models.Index(fields=['seller', '-id'], name='product_seller_id_idx'),
+            # PostgresSearchBackend; only created on PostgreSQL (see migration 0010)
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'sku'], name='product_seller_sku_uniq'),
+        ]
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+
+    COUNTER_FIELDS = RATING_FIELDS + ('search_vector',)
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # aggregates only move through F() updates, never from a stale instance
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = fields_except(self, self.COUNTER_FIELDS)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so saves can tell a re-categorization or stock-out apart
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
     
 
 class ProductImage(models.Model):
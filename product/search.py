@@ -0,0 +1,161 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Func, OuterRef, Q, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from product.models import Category, Product
+
+
+MAX_TERMS = 8
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split user input into plain word terms, dropping any query syntax."""
+    return TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class BaseSearchBackend:
+    """
+    Product full-text search.
+    `search()` filters a queryset and annotates it with `search_rank`
+    (higher is better); `index()`/`remove()` keep the backend in sync.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index(self, product_ids):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed icontains fallback for databases without full-text support."""
+
+    def search(self, queryset, query):
+        for term in tokenize(query):
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(description__icontains=term) | Q(category__name__icontains=term)
+            )
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    tsvector column (`Product.search_vector`) with a GIN index.
+    Terms are stemmed with the `english` config and matched as prefixes.
+    """
+    config = 'english'
+
+    def search(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=self.config)
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        )
+
+    def vector(self):
+        category_name = Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+        return (
+            SearchVector('name', weight='A', config=self.config)
+            + SearchVector('description', weight='B', config=self.config)
+            + SearchVector(Subquery(category_name), weight='C', config=self.config)
+        )
+
+    def index(self, product_ids):
+        Product.objects.filter(pk__in=product_ids).update(search_vector=self.vector())
+
+    def rebuild(self):
+        Product.objects.update(search_vector=self.vector())
+
+
+class _FTS5Rank(Func):
+    """Correlated bm25() lookup for one product row (higher is better)."""
+    template = (
+        '(SELECT -bm25(product_search, 10.0, 5.0, 2.0) FROM product_search '
+        'WHERE product_search MATCH %%s AND product_search.rowid = %(expressions)s)'
+    )
+    output_field = FloatField()
+
+    def __init__(self, expression, match, **extra):
+        super().__init__(expression, **extra)
+        self.match = match
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, (self.match, *params)
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    FTS5 virtual table `product_search` (porter stemmer) keyed by product id,
+    so full-text search behaves the same on a local SQLite database.
+    """
+
+    def search(self, queryset, query):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matched = RawSQL('SELECT rowid FROM product_search WHERE product_search MATCH %s', (match,))
+        return queryset.filter(pk__in=matched).annotate(search_rank=_FTS5Rank(F('pk'), match))
+
+    def index(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM product_search WHERE rowid IN ({placeholders})', product_ids)
+            cursor.execute(
+                'INSERT INTO product_search (rowid, name, description, category) '
+                'SELECT p.id, p.name, p.description, c.name '
+                'FROM product_product p JOIN product_category c ON c.id = p.category_id '
+                f'WHERE p.id IN ({placeholders})',
+                product_ids,
+            )
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM product_search WHERE rowid IN ({placeholders})', product_ids)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM product_search')
+            cursor.execute(
+                'INSERT INTO product_search (rowid, name, description, category) '
+                'SELECT p.id, p.name, p.description, c.name '
+                'FROM product_product p JOIN product_category c ON c.id = p.category_id'
+            )
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    `PRODUCT_SEARCH_BACKEND` (dotted path) wins, otherwise pick by database vendor.
+    """
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)()
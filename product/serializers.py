@@ -4,13 +4,34 @@ from product.models import Category,Product,Review,ProductImage
 from django.contrib.auth import get_user_model
 
 
+class SparseFieldsMixin:
+    """
+    Trim the representation to `?fields=id,name,...`.
+    Unknown names are ignored, an empty selection keeps every field.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        if not wanted & set(self.fields):
+            return
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
 class CategorySerializer(serializers.ModelSerializer):
     product_count = serializers.IntegerField(read_only = True, help_text='Return the number of products in this category')
+    in_stock_count = serializers.IntegerField(read_only = True, help_text='Return the number of in-stock products in this category')
 
     class Meta:
         model = Category
         fields = [
-            'id','name','description','product_count'
+            'id','name','description','product_count','in_stock_count'
         ]
 
 
@@ -36,16 +57,18 @@ class ReviewSerializer(serializers.ModelSerializer):
         review = Review.objects.create(product_id = product_id, **validated_data)
         return review
     
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     seller = serializers.StringRelatedField(read_only=True)
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())  # <-- changed
     reviews = ReviewSerializer(many=True, read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = Product
         fields = [
-            'id', 'name','description','stock', 'price','price_with_tax','images','category','seller', 'reviews'
+            'id', 'sku', 'name','description','stock', 'price','price_with_tax','images','category','seller', 'reviews',
+            'avg_rating', 'rating_count', 'rating_histogram'
         ]
     price_with_tax = serializers.SerializerMethodField(method_name='calculate_tax')
   
@@ -55,9 +78,46 @@ class ProductSerializer(serializers.ModelSerializer):
         if price < 0:
             raise serializers.ValidationError('Price could not be negative')
         return price
+
+    def validate_sku(self, sku):
+        if not sku:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return sku
+        seller = self.instance.seller if self.instance else request.user
+        duplicates = Product.objects.filter(seller=seller, sku=sku)
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError('You already have a product with this SKU')
+        return sku
     
     
 
+class ProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact catalog row: no nested reviews or image list.
+    `image` comes from a queryset annotation, ratings from the denormalized columns.
+    """
+    price_with_tax = serializers.SerializerMethodField(method_name='calculate_tax')
+    image = serializers.SerializerMethodField(method_name='get_image')
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'price', 'price_with_tax', 'stock', 'category', 'image', 'avg_rating', 'review_count'
+        ]
+
+    def calculate_tax(self, product):
+        return (product.price * Decimal('1.10')).quantize(Decimal('0.01'))
+
+    def get_image(self, product):
+        image = getattr(product, 'first_image', None)
+        return image.url if image else None
+
+
 class SimpleUserSerializer(serializers.ModelSerializer):
     name = serializers.SerializerMethodField(method_name='get_current_user_name')
     class Meta:
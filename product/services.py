@@ -0,0 +1,139 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from product.models import Category, Product, Review, RATING_FIELDS
+
+
+class ProductRatingService:
+
+    @staticmethod
+    def apply(product_id, added=None, removed=None):
+        """
+        Move one review into (`added`) and/or out of (`removed`) the product's
+        aggregates with a single UPDATE, so concurrent reviews never lose counts.
+        """
+        delta_sum = (added or 0) - (removed or 0)
+        delta_count = (1 if added else 0) - (1 if removed else 0)
+
+        histogram = {}
+        for star, step in ((added, 1), (removed, -1)):
+            if star:
+                histogram[star] = histogram.get(star, 0) + step
+        changes = {
+            f'rating_{star}_count': F(f'rating_{star}_count') + step
+            for star, step in histogram.items() if step
+        }
+
+        Product.objects.filter(pk=product_id).update(
+            rating_sum=F('rating_sum') + delta_sum,
+            rating_count=F('rating_count') + delta_count,
+            avg_rating=Coalesce(
+                Cast(F('rating_sum') + delta_sum, FloatField()) / NullIf(F('rating_count') + delta_count, 0),
+                Value(0.0),
+            ),
+            **changes
+        )
+
+    @staticmethod
+    def rebuild(product_ids=None, batch_size=500):
+        """
+        Recompute the aggregates from `Review` rows. Used to repair drift.
+        Returns the number of products written.
+        """
+        products = Product.objects.only('id').order_by('id')
+        if product_ids is not None:
+            products = products.filter(pk__in=product_ids)
+
+        stats = Review.objects.values('product_id').annotate(
+            total=Sum('ratings'),
+            count=Count('id'),
+            **{f'star_{star}': Count('id', filter=Q(ratings=star)) for star in range(1, 6)}
+        )
+        if product_ids is not None:
+            stats = stats.filter(product_id__in=product_ids)
+        stats = {row['product_id']: row for row in stats}
+
+        updated = 0
+        batch = []
+        for product in products.iterator(chunk_size=batch_size):
+            row = stats.get(product.id)
+            product.rating_sum = row['total'] if row else 0
+            product.rating_count = row['count'] if row else 0
+            product.avg_rating = product.rating_sum / product.rating_count if row else 0
+            for star in range(1, 6):
+                setattr(product, f'rating_{star}_count', row[f'star_{star}'] if row else 0)
+            batch.append(product)
+            if len(batch) >= batch_size:
+                updated += ProductRatingService._flush(batch)
+                batch = []
+        if batch:
+            updated += ProductRatingService._flush(batch)
+        return updated
+
+    @staticmethod
+    def _flush(batch):
+        with transaction.atomic():
+            Product.objects.bulk_update(batch, RATING_FIELDS)
+        return len(batch)
+
+
+class CategoryCountService:
+
+    @staticmethod
+    def adjust(category_id, products=0, in_stock=0):
+        if not products and not in_stock:
+            return
+        Category.objects.filter(pk=category_id).update(
+            product_count=F('product_count') + products,
+            in_stock_count=F('in_stock_count') + in_stock,
+        )
+
+    @staticmethod
+    def adjust_in_stock(deltas):
+        """`deltas` maps category id -> in_stock_count change; one UPDATE per category."""
+        for category_id, delta in deltas.items():
+            CategoryCountService.adjust(category_id, in_stock=delta)
+
+    @staticmethod
+    def product_saved(product, created):
+        in_stock = int(product.stock > 0)
+        loaded = getattr(product, '_loaded_values', {})
+
+        if created:
+            CategoryCountService.adjust(product.category_id, products=1, in_stock=in_stock)
+        else:
+            old_category_id = loaded.get('category_id', product.category_id)
+            old_in_stock = int(loaded['stock'] > 0) if 'stock' in loaded else in_stock
+            if old_category_id != product.category_id:
+                CategoryCountService.adjust(old_category_id, products=-1, in_stock=-old_in_stock)
+                CategoryCountService.adjust(product.category_id, products=1, in_stock=in_stock)
+            else:
+                CategoryCountService.adjust(product.category_id, in_stock=in_stock - old_in_stock)
+
+        product._loaded_values = {**loaded, 'category_id': product.category_id, 'stock': product.stock}
+
+    @staticmethod
+    def product_deleted(product):
+        CategoryCountService.adjust(product.category_id, products=-1, in_stock=-int(product.stock > 0))
+
+    @staticmethod
+    def refresh(category_ids=None):
+        """
+        Recount from the product table. Used after bulk stock writes that
+        skip signals, and by `reconcile_category_counts`.
+        """
+        def counted(**filters):
+            counts = (
+                Product.objects.filter(category=OuterRef('pk'), **filters)
+                .order_by().values('category').annotate(total=Count('id')).values('total')
+            )
+            return Coalesce(Subquery(counts), 0)
+
+        categories = Category.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=category_ids)
+        return categories.update(
+            product_count=counted(),
+            in_stock_count=counted(stock__gt=0),
+        )
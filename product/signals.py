@@ -0,0 +1,93 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from product import cache
+from product.models import Category, Product, ProductImage, Review
+from product.search import get_search_backend
+from product.services import CategoryCountService
+from product.suggest import suggest_index, PRODUCT, CATEGORY
+
+
+# Sent after writes that bypass model signals (bulk_create / update()).
+# kwargs: product_ids, category_ids (every category the products were or are
+# in; looked up when omitted), fields (changed columns; None means any),
+# in_stock_deltas (category id -> in_stock_count change, for stock moves that
+# know which products crossed zero; the counters then move by that delta
+# after commit instead of being recounted)
+products_bulk_changed = Signal()
+
+SEARCHABLE_FIELDS = {'name', 'description', 'category'}
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, created, **kwargs):
+    CategoryCountService.product_saved(instance, created)
+    cache.bump_products([instance.pk])
+    cache.bump_on_commit((cache.CATEGORIES, None))
+    get_search_backend().index([instance.pk])
+    transaction.on_commit(partial(suggest_index.add, PRODUCT, instance.pk, instance.name))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    CategoryCountService.product_deleted(instance)
+    cache.bump_products([instance.pk])
+    cache.bump_on_commit((cache.CATEGORIES, None))
+    get_search_backend().remove([instance.pk])
+    transaction.on_commit(partial(suggest_index.remove, PRODUCT, instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    # category names feed product search results, so the product list moves too
+    cache.bump_on_commit((cache.CATEGORIES, None), (cache.CATEGORY, instance.pk), (cache.PRODUCTS, None))
+    transaction.on_commit(partial(suggest_index.add, CATEGORY, instance.pk, instance.name))
+    if created:
+        return
+    product_ids = list(instance.products.values_list('id', flat=True))
+    get_search_backend().index(product_ids)
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    cache.bump_on_commit((cache.CATEGORIES, None), (cache.CATEGORY, instance.pk), (cache.PRODUCTS, None))
+    transaction.on_commit(partial(suggest_index.remove, CATEGORY, instance.pk))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_product_children(sender, instance, **kwargs):
+    cache.bump_products([instance.product_id])
+
+
+@receiver(products_bulk_changed)
+def sync_bulk_products(sender, product_ids, category_ids=None, fields=None, in_stock_deltas=None, **kwargs):
+    product_ids = list(product_ids)
+    if in_stock_deltas is not None:
+        # checkout / cancellation: no recount and no category row lock inside
+        # the caller's transaction
+        deltas = {category_id: delta for category_id, delta in in_stock_deltas.items() if delta}
+        if deltas:
+            transaction.on_commit(lambda: CategoryCountService.adjust_in_stock(deltas))
+            cache.bump_on_commit((cache.CATEGORIES, None))
+    else:
+        if category_ids is None:
+            category_ids = set(Product.objects.filter(pk__in=product_ids).values_list('category_id', flat=True))
+        if category_ids:
+            CategoryCountService.refresh(list(category_ids))
+        cache.bump_on_commit((cache.CATEGORIES, None))
+    # the list rows carry `stock`, so every stock move invalidates them too
+    cache.bump_products(product_ids)
+    if fields is not None and not SEARCHABLE_FIELDS.intersection(fields):
+        # e.g. stock-only moves from checkout: nothing searchable changed
+        return
+    get_search_backend().index(product_ids)
+    names = list(Product.objects.filter(pk__in=product_ids).values_list('id', 'name'))
+
+    def _suggest():
+        for pk, name in names:
+            suggest_index.add(PRODUCT, pk, name)
+    transaction.on_commit(_suggest)
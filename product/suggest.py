@@ -0,0 +1,266 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+from product.models import Category, Product
+from product.search import tokenize
+
+
+logger = logging.getLogger(__name__)
+
+PRODUCT = 'product'
+CATEGORY = 'category'
+
+
+def max_edits(term):
+    """Typo budget grows with the term: none below 3 chars, then 1, then 2."""
+    if len(term) < 3:
+        return 0
+    if len(term) <= 5:
+        return 1
+    return 2
+
+
+def trigrams(word):
+    padded = f'$${word}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def prefix_distance(term, word, limit):
+    """
+    Edit distance (with adjacent transpositions) between `term` and the
+    closest prefix of `word`, or None once it is certain to exceed `limit`.
+    """
+    before = None
+    previous = list(range(len(word) + 1))
+    for i, char in enumerate(term, 1):
+        current = [i]
+        for j, other in enumerate(word, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other),
+            )
+            if before is not None and j > 1 and char == word[j - 2] and term[i - 2] == other:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+    distance = min(previous)
+    return distance if distance <= limit else None
+
+
+class _Index:
+    """
+    One build of the suggest index: sorted word list for exact prefix hits
+    (bisect), trigram postings for typos.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.postings = defaultdict(set)
+        self.words = []
+        self.grams = defaultdict(set)
+
+    def add(self, key, name):
+        self.entries[key] = name
+        for word in set(tokenize(name)):
+            if word not in self.postings:
+                insort(self.words, word)
+                for gram in trigrams(word):
+                    self.grams[gram].add(word)
+            self.postings[word].add(key)
+
+    def remove(self, key):
+        name = self.entries.pop(key, None)
+        if name is None:
+            return
+        for word in set(tokenize(name)):
+            keys = self.postings.get(word)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if keys:
+                continue
+            del self.postings[word]
+            index = bisect_left(self.words, word)
+            if index < len(self.words) and self.words[index] == word:
+                del self.words[index]
+            for gram in trigrams(word):
+                self.grams[gram].discard(word)
+                if not self.grams[gram]:
+                    del self.grams[gram]
+
+    def match_term(self, term, prefix_candidates, fuzzy_candidates):
+        """Return {word: cost} for indexed words the term could be a prefix of."""
+        matches = {}
+        start = bisect_left(self.words, term)
+        for word in self.words[start:start + prefix_candidates]:
+            if not word.startswith(term):
+                break
+            matches[word] = 0
+
+        limit = max_edits(term)
+        if not limit:
+            return matches
+
+        grams = trigrams(term)
+        shared = defaultdict(int)
+        for gram in grams:
+            for word in self.grams.get(gram, ()):
+                shared[word] += 1
+        needed = max(1, len(grams) - 3 * limit)
+        candidates = sorted(
+            (word for word, count in shared.items() if count >= needed and word not in matches),
+            key=lambda word: -shared[word],
+        )[:fuzzy_candidates]
+        for word in candidates:
+            distance = prefix_distance(term, word, limit)
+            if distance is not None:
+                matches[word] = distance
+        return matches
+
+
+class SuggestIndex:
+    """
+    In-process autocomplete over product and category names.
+     - Warmed in the background when the web process starts (see wsgi/asgi),
+       kept current by product/category signals and rebuilt in the background
+       every SUGGEST_INDEX_TTL seconds so other worker processes' writes are
+       picked up too
+     - A build reads the catalog without holding the lock; only the swap of
+       the finished index (plus replaying signal updates that arrived
+       meanwhile) is done under it, so suggestions never wait on the DB
+     - Only a request arriving before the first build has finished waits for it
+    """
+    fuzzy_candidates = 50
+    prefix_candidates = 200
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index = None
+        self._built_at = None
+        # Event of the build in flight, and the signal updates it must replay
+        self._building = None
+        self._pending = []
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'SUGGEST_INDEX_TTL', 300)
+
+    def build(self):
+        """Rebuild from the database, or wait for the build already in flight."""
+        with self._lock:
+            done = self._building
+            if done is None:
+                done = self._building = threading.Event()
+                self._pending = []
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            done.wait()
+            return
+
+        try:
+            index = _Index()
+            for pk, name in Category.objects.values_list('id', 'name'):
+                index.add((CATEGORY, pk), name)
+            for pk, name in Product.objects.values_list('id', 'name').iterator(chunk_size=2000):
+                index.add((PRODUCT, pk), name)
+            with self._lock:
+                for key, name in self._pending:
+                    index.remove(key)
+                    if name is not None:
+                        index.add(key, name)
+                self._index = index
+                self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._building = None
+                self._pending = []
+            done.set()
+
+    def build_async(self):
+        threading.Thread(target=self._build_in_background, name='suggest-index', daemon=True).start()
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Suggest index build failed')
+        finally:
+            # the thread's own DB connection
+            connections.close_all()
+
+    def ensure_built(self):
+        if self._built_at is None:
+            self.build()
+        elif time.monotonic() - self._built_at > self.ttl and self._building is None:
+            self.build_async()
+
+    def add(self, kind, pk, name):
+        self._apply((kind, pk), name)
+
+    def remove(self, kind, pk):
+        self._apply((kind, pk), None)
+
+    def _apply(self, key, name):
+        with self._lock:
+            if self._building is not None:
+                self._pending.append((key, name))
+            if self._index is None:
+                return
+            self._index.remove(key)
+            if name is not None:
+                self._index.add(key, name)
+
+    def suggest(self, query, limit=10):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self.ensure_built()
+
+        with self._lock:
+            index = self._index
+            if index is None:
+                # the first build failed; the next request retries it
+                return []
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for word, cost in index.match_term(term, self.prefix_candidates, self.fuzzy_candidates).items():
+                    for key in index.postings[word]:
+                        if cost < term_scores.get(key, cost + 1):
+                            term_scores[key] = cost
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {key: scores[key] + cost for key, cost in term_scores.items() if key in scores}
+                if not scores:
+                    return []
+
+            ranked = sorted(
+                scores.items(),
+                key=lambda item: (item[1], item[0][0] != CATEGORY, len(index.entries[item[0]]), index.entries[item[0]], item[0][1]),
+            )
+            results = []
+            seen = set()
+            for (kind, pk), _ in ranked:
+                name = index.entries[(kind, pk)]
+                if (kind, name.lower()) in seen:
+                    continue
+                seen.add((kind, name.lower()))
+                results.append({'type': kind, 'id': pk, 'name': name})
+                if len(results) >= limit:
+                    break
+            return results
+
+
+suggest_index = SuggestIndex()
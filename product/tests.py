@@ -1,3 +1,41 @@
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from product.models import Category, Product
+
+
+class ConditionalCachedListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Groceries')
+        cls.product = Product.objects.create(
+            name='Rice', description='test', price=Decimal('10.00'), stock=5, category=category,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_etag_follows_the_cached_body(self):
+        first = self.client.get('/api/v1/products/')
+
+        # a write that moves updated_at without bumping the versions
+        Product.objects.filter(pk=self.product.pk).update(stock=3, updated_at=timezone.now())
+        second = self.client.get('/api/v1/products/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        self.product.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        third = self.client.get('/api/v1/products/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third['X-Cache'], 'MISS')
+        self.assertNotEqual(third['ETag'], first['ETag'])
 
-# Create your tests here.
+        fourth = self.client.get('/api/v1/products/', HTTP_IF_NONE_MATCH=third['ETag'])
+        self.assertEqual(fourth.status_code, 304)
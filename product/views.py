@@ -1,60 +1,89 @@
 from django.shortcuts import render,get_object_or_404
-from django.http import HttpResponse
-from rest_framework.decorators import api_view
-from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, action
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Prefetch
+from cloudinary.models import CloudinaryField
 from rest_framework.response import Response
 from product.models import Product, Category,Review, ProductImage
 from rest_framework import status
-from product.serializers import ProductSerializer, CategorySerializer, ReviewSerializer, ProductImageSerializer
+from product.serializers import ProductSerializer, ProductListSerializer, CategorySerializer, ReviewSerializer, ProductImageSerializer
 from rest_framework.views import APIView
 from rest_framework.mixins import CreateModelMixin, ListModelMixin
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.viewsets import ModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend 
-from product.filters import ProductFilter
+from product.filters import ProductFilter, ProductSearchFilter
 from rest_framework.filters import SearchFilter,OrderingFilter
 from rest_framework.pagination import PageNumberPagination
 
 from rest_framework.permissions import DjangoModelPermissions, DjangoModelPermissionsOrAnonReadOnly, IsAuthenticated
 
-from product.paginations import DefaultPagination
+from product.paginations import DefaultPagination, CursorPaginationMixin
+from product.cache import CachedResponseMixin, ConditionalGetMixin, PRODUCTS, PRODUCT, CATEGORIES, CATEGORY
+from product.services import ProductRatingService
+from product.suggest import suggest_index
+from product.imports import ProductImporter, detect_format, iter_rows, FORMATS
+from product import exports
+from rest_framework.parsers import MultiPartParser
 # from product.permissions import IsSellerOrAdmin
 # from rest_framework.permissions import IsAdminUser , AllowAny
 from api.permissions import IsAdminOrReadOnly, FullDjangoModelPermission
 
 from product.permissions import IsReviewAuthorOrReadOnly,IsSellerOrAdminOrReadOnly
 from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
 
 from rest_framework import viewsets
 
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, CachedResponseMixin, CursorPaginationMixin, ModelViewSet):
     """
     API endpoint for managing products in the e-commerce store
      - Allows authenticated admin to create , update, delete products
      - Allows users to browse ad filter product
-     - Support searching by name,description and category
+     - Support full-text searching by name,description and category (ranked, prefix, stemmed)
      - Support ordering y price ad updated at
+     - Pass ?pagination=cursor for keyset pages (no count, constant cost per page)
+     - List rows are compact (no nested reviews), ?fields=id,name,... trims further
+     - /products/suggest/?q= answers search-as-you-type from an in-memory index
+     - /products/export/ streams the (filtered) catalog as CSV or NDJSON
+     - List and detail responses are served from a versioned cache, with ETags (304 on If-None-Match)
     """
 
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_class = ProductFilter
     pagination_class = DefaultPagination
-    search_fields = ['name','description', 'category__name']
-    ordering_fields = ['price', 'updated_at']
+    ordering_fields = ['price', 'updated_at', 'avg_rating']
 
     permission_classes = [IsSellerOrAdminOrReadOnly]  # <-- updated
+    cache_list_scopes = [PRODUCTS]
+    cache_object_scope = PRODUCT
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProductListSerializer
+        return ProductSerializer
 
     def get_queryset(self):
-        return Product.objects.prefetch_related('images', 'reviews').all()
+        if self.action == 'list':
+            first_image = ProductImage.objects.filter(product=OuterRef('pk')).order_by('id').values('image')[:1]
+            return Product.objects.annotate(
+                first_image=Subquery(first_image, output_field=CloudinaryField('image')),
+            )
+        return Product.objects.prefetch_related(
+            'images',
+            Prefetch('reviews', queryset=Review.objects.select_related('user')),
+        ).all()
 
     def perform_create(self, serializer):   # <-- added
         serializer.save(seller=self.request.user)
 
     @swagger_auto_schema(
-        operation_summary='Retrieve a list of products'
+        operation_summary='Retrieve a list of products',
+        responses={200: ProductListSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -70,9 +99,48 @@ class ProductViewSet(ModelViewSet):
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
-class ProductImageViewSet(ModelViewSet):
+    @swagger_auto_schema(
+        operation_summary='Autocomplete product and category names (typo tolerant)',
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ]
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def suggest(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 20)
+        except ValueError:
+            limit = 10
+        return Response(suggest_index.suggest(query, limit=limit))
+
+    @swagger_auto_schema(
+        operation_summary='Stream the whole (filtered) catalog as CSV or NDJSON',
+        manual_parameters=[
+            openapi.Parameter('file_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=sorted(exports.FORMATS)),
+        ]
+    )
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def export(self, request):
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in exports.FORMATS:
+            return Response(
+                {'detail': f'Unsupported format, use one of: {", ".join(exports.FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(Product.objects.all())
+        response = StreamingHttpResponse(exports.iter_export(queryset, fmt), content_type=exports.FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+        return response
+
+class ProductImageViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ProductImageSerializer
     permission_classes = [IsSellerOrAdminOrReadOnly]
+    last_modified_field = None
+
+    def get_etag_versions(self):
+        return [(PRODUCT, self.kwargs.get('product_pk'))]
 
     def get_queryset(self):
         queryset = ProductImage.objects.filter(product_id = self.kwargs.get('product_pk'))
@@ -82,21 +150,44 @@ class ProductImageViewSet(ModelViewSet):
 
     
 
-class CategoryViewSet(ModelViewSet):
-    queryset = Category.objects.annotate(product_count = Count('products'))
+class CategoryViewSet(ConditionalGetMixin, CachedResponseMixin, ModelViewSet):
+    queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
+    last_modified_field = None
+    cache_list_scopes = [CATEGORIES]
+    cache_detail_scopes = [CATEGORIES]
+    cache_object_scope = CATEGORY
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [IsReviewAuthorOrReadOnly]
+
+    def get_etag_versions(self):
+        return [(PRODUCT, self.kwargs.get('product_pk'))]
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user)
+            ProductRatingService.apply(review.product_id, added=review.ratings)
         
     def perform_update(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            # locked re-read: a concurrent edit must not leave a stale rating to subtract
+            serializer.instance = Review.objects.select_for_update().get(pk=serializer.instance.pk)
+            old_ratings = serializer.instance.ratings
+            review = serializer.save(user=self.request.user)
+            ProductRatingService.apply(review.product_id, added=review.ratings, removed=old_ratings)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance = Review.objects.select_for_update().filter(pk=instance.pk).first()
+            if instance is None:
+                return
+            product_id, ratings = instance.product_id, instance.ratings
+            instance.delete()
+            ProductRatingService.apply(product_id, removed=ratings)
 
     def get_queryset(self):
         queryset = Review.objects.filter(product_id = self.kwargs.get('product_pk'))
@@ -107,17 +198,18 @@ class ReviewViewSet(ModelViewSet):
 
 
 
-class SellerProductViewSet(viewsets.ReadOnlyModelViewSet):
+class SellerProductViewSet(CursorPaginationMixin, viewsets.ReadOnlyModelViewSet):
     """
     Dashboard for sellers:
     - List only products created by the logged-in seller
     - Supports filtering, search, and ordering
+    - Supports ?pagination=cursor keyset paging
+    - POST /seller-products/bulk/ upserts a CSV / JSON Lines file keyed on sku
     """
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]  
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_fields = ['category']  
-    search_fields = ['name', 'description']
     ordering_fields = ['price', 'updated_at']
     pagination_class = DefaultPagination
 
@@ -128,4 +220,41 @@ class SellerProductViewSet(viewsets.ReadOnlyModelViewSet):
         elif user.role == 'admin':
             return Product.objects.all().prefetch_related('images')
         else:
-            return Product.objects.none()
\ No newline at end of file
+            return Product.objects.none()
+
+    @swagger_auto_schema(
+        operation_summary='Bulk create/update products from CSV or JSON Lines (upsert on sku)',
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=False),
+            openapi.Parameter('file_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(FORMATS)),
+        ]
+    )
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[MultiPartParser])
+    def bulk(self, request):
+        """
+        Upload as multipart `file`, or send the raw body with
+        Content-Type text/csv / application/x-ndjson.
+        Columns: sku, name, description, price, stock, category
+        """
+        if request.user.role not in ['seller', 'admin']:
+            return Response({'detail': 'Only sellers can import products.'}, status=status.HTTP_403_FORBIDDEN)
+
+        content_type = request.content_type or ''
+        if content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'detail': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
+            stream, name = upload, upload.name
+        else:
+            # the raw request body is read line by line, never buffered whole
+            stream, name = request._request, ''
+
+        fmt = request.query_params.get('file_format') or detect_format(name, content_type)
+        if fmt not in FORMATS:
+            return Response(
+                {'detail': f'Unsupported format, use one of: {", ".join(FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = ProductImporter(seller=request.user).run(iter_rows(stream, fmt))
+        return Response(report)
@@ -41,4 +41,9 @@ class User(AbstractUser):
     @property
     def is_customer(self):
         return self.role == self.CUSTOMER
+
+    @property
+    def is_admin(self):
+        # staff accounts predate the role field and stay admins
+        return self.role == self.ADMIN or self.is_staff
     
\ No newline at end of file